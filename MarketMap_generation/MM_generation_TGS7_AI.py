@@ -1,12 +1,25 @@
-import requests
 import json
+import os
 import traceback
 
-from MarketMap_generation.data_processor_AI import process_data
-from MarketMap_generation.helpers_AI import generate_results_content, generate_csv_content, create_zip_file, create_sector_based_output, filter_by_sector
+from MarketMap_generation.checkpoint import Checkpoint
+from MarketMap_generation.graphql_cache import cached_post
+from MarketMap_generation.instrumentation import timed
+from MarketMap_generation.paginated_fetch import iter_profile_pages
+from MarketMap_generation.streaming_json import iter_streamed_pages
+from MarketMap_generation.logo_downloader import download_logo
+from MarketMap_generation.data_processor_AI import process_data, process_data_to_archive
+from MarketMap_generation.helpers_AI import results_writer, generate_csv_content, create_zip_file, create_streamed_zip_file, create_sector_based_output, filter_by_sector, create_all_sector_outputs
 
 url = "https://beta.node.thegrid.id/graphql"
 
+# Set MM_PAGE_SIZE to fetch profileInfos in pages and start processing on the first page.
+page_size = int(os.getenv("MM_PAGE_SIZE", "0"))
+# Set MM_STREAM_JSON=1 to decode the single profileInfos response profile by profile as it downloads.
+stream_json = os.getenv("MM_STREAM_JSON", "").lower() in ("1", "true", "yes")
+# Set MM_PIPELINE=1 to overlap fetching, logo downloads and archive writes (General mode).
+pipeline_mode = os.getenv("MM_PIPELINE", "").lower() in ("1", "true", "yes")
+
 query = """
 query GetLogosForMM_AI_Solana {
   profileInfos(
@@ -86,8 +99,9 @@ query GetLogosForMM_AI_Solana {
 }
 """
 
+@timed("fetch")
 def fetch_data(url, query):
-    response = requests.post(url, json={'query': query})
+    response = cached_post(url, query)
     print(f"HTTP Status Code: {response.status_code}")
 
     if response.status_code == 200:
@@ -107,16 +121,41 @@ def fetch_data(url, query):
         print(f"Response content: {response.text}")
         raise Exception(f"Query failed with status code: {response.status_code}")
 
+def export_pipelined(data, version, download=download_logo):
+
+    # Logos stream from the download stage straight into the archive
+    def write_logos(zip_file):
+        tree, skipped_items, logos, results, csv_data, sector_counts, sector_index = process_data_to_archive(data, zip_file, download=download)
+        results_content = results_writer(tree, results, skipped_items, len(logos), sector_counts)
+        return results_content, generate_csv_content(csv_data)
+
+    return create_streamed_zip_file(write_logos, version)
+
 def main():
     version = input("Please enter the version: ").strip()
-    generation_mode = input("Choose generation mode ('General' or 'Sector'): ").strip().lower()
+    generation_mode = input("Choose generation mode ('General', 'Sector' or 'All'): ").strip().lower()
 
     try:
-        data = fetch_data(url, query)
-        tree, skipped_items, logos, results, csv_data, sector_counts = process_data(data)
+        # Fetched profiles and downloaded logos are kept until the archives exist, so a rerun resumes
+        checkpoint = Checkpoint(f"ai_v{version}")
+        if page_size > 0:
+            data = checkpoint.pages(lambda offset: iter_profile_pages(url, query, page_size=page_size, start_offset=offset), resumable=True)
+        elif stream_json:
+            data = checkpoint.pages(lambda offset: iter_streamed_pages(url, query))
+        else:
+            data = checkpoint.response(lambda: fetch_data(url, query))
+        download = checkpoint.wrap_download(download_logo)
+
+        if pipeline_mode and generation_mode == "general":
+            zip_filename = export_pipelined(data, version, download)
+            checkpoint.finish()
+            print(f"Export completed successfully. Zip file created: {zip_filename}")
+            return
+
+        tree, skipped_items, logos, results, csv_data, sector_counts, sector_index = process_data(data, download=download)
 
         if generation_mode == "general":
-            results_content = generate_results_content(tree, results, skipped_items, len(logos), sector_counts)
+            results_content = results_writer(tree, results, skipped_items, len(logos), sector_counts)
             csv_content = generate_csv_content(csv_data)
             zip_filename = create_zip_file(logos, results_content, csv_content, version)
         elif generation_mode == "sector":
@@ -130,8 +169,8 @@ def main():
                 specific_sector = available_sectors[sector_choice - 1]
                 print(f"\nYou selected: {specific_sector}")
                 filtered_tree, filtered_data, filtered_logos, filtered_results = filter_by_sector(
-                    tree, csv_data, logos, results, specific_sector)
-                results_content = generate_results_content(
+                    tree, csv_data, logos, results, specific_sector, sector_index)
+                results_content = results_writer(
                     filtered_tree, filtered_results, skipped_items, len(filtered_logos),
                     {specific_sector: len(filtered_results)}
                 )
@@ -142,10 +181,18 @@ def main():
             else:
                 print("Invalid choice. Exiting.")
                 return
+        elif generation_mode == "all":
+            # One fetch and one logo pass: the general archive plus one archive per sector
+            results_content = results_writer(tree, results, skipped_items, len(logos), sector_counts)
+            csv_content = generate_csv_content(csv_data)
+            zip_filename = create_zip_file(logos, results_content, csv_content, version)
+            sector_filenames = create_all_sector_outputs(tree, csv_data, logos, results, skipped_items, sector_counts, version, sector_index)
+            print(f"Created {len(sector_filenames)} sector archives.")
         else:
-            print("Invalid generation mode. Please choose 'general' or 'Sector'.")
+            print("Invalid generation mode. Please choose 'General', 'Sector' or 'All'.")
             return
 
+        checkpoint.finish()
         print(f"Export completed successfully. Zip file created: {zip_filename}")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
@@ -0,0 +1,138 @@
+import hashlib
+import io
+import json
+import os
+import posixpath
+import stat
+import time
+import zipfile
+from contextlib import contextmanager
+
+from MarketMap_generation.instrumentation import REPORT_ENABLED, record, write_report
+
+# Image formats that are already compressed; deflating them again costs CPU for ~0% gain.
+STORED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.gif', '.avif', '.heic'}
+
+# Deflate level for text entries (CSV, summaries, SVG). 1 is the fast setting, 9 the smallest.
+DEFAULT_COMPRESSLEVEL = int(os.getenv("MM_ZIP_LEVEL", "6"))
+
+# How repeated logo bytes are stored: "off" (a full copy at every path, the default), "symlink"
+# (one blob, symlink entries at the other paths, plus LOGO_LINKS_NAME) or "manifest" (one blob,
+# the other paths only listed in LOGO_LINKS_NAME). Dedup is opt-in because Python's zipfile,
+# Windows Explorer and many unzip tools extract symlink entries as small text files.
+LOGO_DEDUP = os.getenv("MM_LOGO_DEDUP", "off").lower()
+LOGO_LINKS_NAME = "logo_links.json"
+
+def compression_for(arcname, compresslevel=DEFAULT_COMPRESSLEVEL):
+    """Return the (compress_type, compresslevel) used for an entry name."""
+    if os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED, None
+    return zipfile.ZIP_DEFLATED, compresslevel
+
+class PolicyZipFile(zipfile.ZipFile):
+    """ZipFile that picks the compression of each entry from its extension.
+
+    An explicit compress_type passed to write/writestr still wins.
+    Logos added through writelogo() are stored once per distinct content.
+    """
+
+    def __init__(self, *args, logo_dedup=LOGO_DEDUP, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.logo_dedup = logo_dedup
+        self._logo_blobs = {}  # sha256 -> arcname holding the bytes
+        self.logo_links = {}   # arcname -> arcname holding its bytes
+
+    def writestr(self, zinfo_or_arcname, data, compress_type=None, compresslevel=None):
+        if compress_type is None and not isinstance(zinfo_or_arcname, zipfile.ZipInfo):
+            compress_type, compresslevel = compression_for(zinfo_or_arcname, self.compresslevel)
+        super().writestr(zinfo_or_arcname, data, compress_type=compress_type, compresslevel=compresslevel)
+
+    def write(self, filename, arcname=None, compress_type=None, compresslevel=None):
+        if compress_type is None:
+            compress_type, compresslevel = compression_for(arcname or filename, self.compresslevel)
+        super().write(filename, arcname, compress_type=compress_type, compresslevel=compresslevel)
+
+    def writetext(self, arcname, content):
+        """Write a UTF-8 text entry from a str or from a `render(stream)` callable.
+
+        A callable writes into the (compressed) entry as it renders, so the
+        text never has to exist as one string; the stored bytes are the same
+        as writestr() of the rendered text (at the default MM_ZIP_LEVEL).
+        """
+        if isinstance(content, str):
+            self.writestr(arcname, content)
+            return
+        zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime(time.time())[:6])
+        zinfo.compress_type, compresslevel = compression_for(arcname, self.compresslevel)
+        if hasattr(zinfo, 'compress_level'):
+            # Public from Python 3.13; before that deflate uses zlib's default level (6, as DEFAULT_COMPRESSLEVEL)
+            zinfo.compress_level = compresslevel
+        zinfo.external_attr = 0o600 << 16  # same mode writestr gives named entries
+        with self.open(zinfo, 'w') as entry, io.TextIOWrapper(entry, encoding='utf-8', newline='') as stream:
+            content(stream)
+
+    def writelogo(self, arcname, content):
+        """Write a logo, or a link to an identical logo already in the archive."""
+        if self.logo_dedup == "off":
+            self.writestr(arcname, content)
+            return
+        digest = hashlib.sha256(content).digest()
+        target = self._logo_blobs.get(digest)
+        if target is None or target == arcname:
+            self._logo_blobs[digest] = arcname
+            self.writestr(arcname, content)
+            return
+        self.logo_links[arcname] = target
+        record("logo_dedup", nbytes=len(content))
+        if self.logo_dedup == "symlink":
+            zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime(time.time())[:6])
+            zinfo.create_system = 3  # Unix, so unzip restores the mode bits as a symlink
+            zinfo.external_attr = (stat.S_IFLNK | 0o777) << 16
+            self.writestr(zinfo, posixpath.relpath(target, posixpath.dirname(arcname)), compress_type=zipfile.ZIP_STORED)
+
+    def close(self):
+        # Tools that do not follow symlink entries can resolve every path through this list
+        if self.mode in ('w', 'x', 'a') and self.fp is not None and self.logo_links:
+            self.writestr(LOGO_LINKS_NAME, json.dumps(self.logo_links, indent=2, ensure_ascii=False))
+        super().close()
+
+def read_entry(zip_file, arcname):
+    """Read an entry, following logo links (symlink entries or LOGO_LINKS_NAME)."""
+    info = zip_file.NameToInfo.get(arcname)
+    if info is None:
+        if LOGO_LINKS_NAME not in zip_file.NameToInfo:
+            raise KeyError(arcname)
+        links = getattr(zip_file, '_read_links', None)
+        if links is None:
+            links = zip_file._read_links = json.loads(zip_file.read(LOGO_LINKS_NAME))
+        return zip_file.read(links[arcname])
+    if stat.S_ISLNK(info.external_attr >> 16):
+        target = zip_file.read(info).decode('utf-8')
+        return zip_file.read(posixpath.normpath(posixpath.join(posixpath.dirname(arcname), target)))
+    return zip_file.read(info)
+
+
+@contextmanager
+def open_archive(zip_path, compresslevel=DEFAULT_COMPRESSLEVEL, report=REPORT_ENABLED):
+    """Open a ZIP archive that streams entries straight to `zip_path`.
+
+    Entries are compressed and written as they are added, so nothing but the
+    entry being written is held in memory. The archive is built under a
+    `.partial` name and only renamed into place once it is complete. With
+    `report`, the run's stage report is written next to it as `*.report.json`.
+    """
+    os.makedirs(os.path.dirname(zip_path) or '.', exist_ok=True)
+    partial_path = f"{zip_path}.partial"
+    started = time.perf_counter()
+    try:
+        with PolicyZipFile(partial_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zip_file:
+            yield zip_file
+        os.replace(partial_path, zip_path)
+    except BaseException:
+        record("archive", seconds=time.perf_counter() - started, failed=True)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    record("archive", seconds=time.perf_counter() - started, nbytes=os.path.getsize(zip_path))
+    if report:
+        print(f"Run report written: {write_report(zip_path)}")
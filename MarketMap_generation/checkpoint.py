@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+from MarketMap_generation.graphql_cache import CACHE_DIR
+from MarketMap_generation.logo_cache import LOGO_CACHE_ENABLED, _write_atomic, load_blob, store_blob
+
+CHECKPOINT_ENABLED = os.getenv("MM_CHECKPOINT", "1").lower() not in ("0", "false", "no")
+CHECKPOINT_DIR = os.getenv("MM_CHECKPOINT_DIR", os.path.join(CACHE_DIR, "checkpoints"))
+# Checkpoints older than this (seconds) are discarded instead of resumed, so stale data is not exported.
+CHECKPOINT_MAX_AGE = int(os.getenv("MM_CHECKPOINT_MAX_AGE", str(24 * 3600)))
+
+PAGE_SIZE = 500  # profiles per page when replaying saved profiles
+
+class Checkpoint:
+    """Working directory that lets an interrupted generation resume.
+
+    profiles.jsonl   fetched profiles, appended page by page ("fetched" marks it complete)
+    steps/<key>.json results of other fetch steps, e.g. embedded-wallets ID chunks
+    logos.jsonl      logo URL -> sha256 of every downloaded logo; the bytes live in
+                     the logo cache's blob store, so they are not written twice
+
+    Everything is written as it arrives, so a failure in processing or while
+    writing the archives loses nothing; the next run with the same name reads
+    it back instead of fetching and downloading again. finish() removes the
+    directory once the archives exist. A disabled checkpoint passes every
+    call straight through.
+    """
+
+    def __init__(self, name, enabled=CHECKPOINT_ENABLED, max_age=CHECKPOINT_MAX_AGE):
+        self.enabled = enabled
+        self.directory = os.path.join(CHECKPOINT_DIR, re.sub(r'[^A-Za-z0-9._-]+', '_', name))
+        self._lock = threading.Lock()
+        self._files = {}
+        self._logos = {}
+        self._saved_profiles = 0
+        if not enabled:
+            return
+
+        started_at = self._started_at()
+        if started_at is not None and max_age and time.time() - started_at > max_age:
+            print(f"Discarding checkpoint older than {max_age // 3600}h: {self.directory}")
+            shutil.rmtree(self.directory, ignore_errors=True)
+            started_at = None
+        os.makedirs(self.directory, exist_ok=True)
+        if started_at is None:
+            _write_atomic(self._path("started_at"), str(time.time()).encode("utf-8"))
+            return
+
+        self._drop_torn_line("profiles.jsonl")
+        self._drop_torn_line("logos.jsonl")
+        self._saved_profiles = sum(1 for _ in self._read_profiles())
+        self._logos = dict(self._read_jsonl("logos.jsonl", lambda item: (item["url"], item["sha256"])))
+        print(f"Resuming from checkpoint {self.directory}: {self._saved_profiles} profiles"
+              f"{' (fetch complete)' if self.fetch_complete else ''}, {len(self._logos)} logos")
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def _started_at(self):
+        try:
+            with open(self._path("started_at"), "r", encoding="utf-8") as f:
+                return float(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _drop_torn_line(self, name):
+        # A run killed mid-write can leave a partial last line; cut it off before appending again
+        try:
+            with open(self._path(name), "rb+") as f:
+                valid = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    valid += len(line)
+                f.truncate(valid)
+        except FileNotFoundError:
+            pass
+
+    def _read_jsonl(self, name, convert=lambda item: item):
+        try:
+            with open(self._path(name), "r", encoding="utf-8") as f:
+                for line in f:
+                    yield convert(json.loads(line))
+        except FileNotFoundError:
+            return
+
+    def _read_profiles(self):
+        return self._read_jsonl("profiles.jsonl")
+
+    def _append_jsonl(self, name, items):
+        with self._lock:
+            f = self._files.get(name)
+            if f is None:
+                f = self._files[name] = open(self._path(name), "a", encoding="utf-8")
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            f.flush()
+
+    @property
+    def fetch_complete(self):
+        return self.enabled and os.path.exists(self._path("fetched"))
+
+    def pages(self, fetch, resumable=False):
+        """Yield pages of profiles: saved ones first, then the rest from `fetch(offset)`.
+
+        `fetch(offset)` returns an iterable of pages. A `resumable` source
+        starts at `offset` (e.g. limit/offset paging); any other source is
+        read from the start again and its first `offset` profiles dropped.
+        """
+        if not self.enabled:
+            yield from fetch(0)
+            return
+        page = []
+        for profile in self._read_profiles():
+            page.append(profile)
+            if len(page) == PAGE_SIZE:
+                yield page
+                page = []
+        if page:
+            yield page
+        if self.fetch_complete:
+            return
+
+        skip = 0 if resumable else self._saved_profiles
+        for page in fetch(self._saved_profiles if resumable else 0):
+            if skip:
+                page, skip = page[skip:], max(0, skip - len(page))
+                if not page:
+                    continue
+            self._append_jsonl("profiles.jsonl", page)
+            yield page
+        _write_atomic(self._path("fetched"), b"")
+
+    def response(self, fetch):
+        """Full profileInfos response: the saved one, or `fetch()` saved before it is returned."""
+        if not self.enabled:
+            return fetch()
+        if self.fetch_complete:
+            return {'data': {'profileInfos': list(self._read_profiles())}}
+        data = fetch()
+        with self._lock, open(self._path("profiles.jsonl"), "w", encoding="utf-8") as f:
+            for profile in data['data']['profileInfos']:
+                f.write(json.dumps(profile, ensure_ascii=False) + "\n")
+        _write_atomic(self._path("fetched"), b"")
+        return data
+
+    def step(self, key, compute):
+        """Result of `compute()` for `key`, saved as JSON; None results are not saved."""
+        if not self.enabled:
+            return compute()
+        path = self._path("steps", f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        result = compute()
+        if result is not None:
+            _write_atomic(path, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+        return result
+
+    def wrap_download(self, download, logo_cache=LOGO_CACHE_ENABLED):
+        """Wrap a logo download function so downloaded logos are kept and reused.
+
+        Only the content hash is recorded; the bytes are read back from the
+        logo cache's blob store. Without the logo cache (MM_LOGO_CACHE=0)
+        there is nowhere to read them from, so logos are downloaded again.
+        """
+        if not self.enabled or not logo_cache:
+            return download
+
+        def checkpointed(logo_url, *args, **kwargs):
+            content_hash = self._logos.get(logo_url)
+            if content_hash:
+                content = load_blob(content_hash)
+                if content is not None:
+                    return content
+            content = download(logo_url, *args, **kwargs)
+            if content:
+                try:
+                    # Usually already there from the download; logos carried over from an archive are not
+                    content_hash = store_blob(content)
+                except OSError as e:
+                    print(f"Could not checkpoint logo {logo_url}: {str(e)}")
+                    return content
+                self._append_jsonl("logos.jsonl", [{"url": logo_url, "sha256": content_hash}])
+                self._logos[logo_url] = content_hash
+            return content
+
+        return checkpointed
+
+    def finish(self):
+        """Drop the working directory once the outputs are written."""
+        if self.enabled:
+            with self._lock:
+                for f in self._files.values():
+                    f.close()
+                self._files.clear()
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -2,120 +2,146 @@ import os
 from collections import defaultdict
 from urllib.parse import urlparse
 
-import requests
+from MarketMap_generation.paginated_fetch import iter_pages, iter_profiles
+from MarketMap_generation.pipeline import ArchiveLogoSink, run_pipeline, DEFAULT_QUEUE_SIZE
+from MarketMap_generation.profile_record import ProfileRecord
+from MarketMap_generation.instrumentation import timed
+from MarketMap_generation.logo_downloader import LogoDownloader, download_logo, DEFAULT_MAX_WORKERS, DEFAULT_TIMEOUT
 
-def process_data(data):
+@timed("process")
+def process_data(data, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT, download=download_logo):
 
-    profiles = data['data']['profileInfos']
+    profiles = iter_profiles(data)  # full response or an iterable of pages
     tree = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))  # sector -> product_type -> profiles
     skipped_items = []
     logos = {}
     results = []
     csv_data = []
     sector_counts = defaultdict(int)
-
-    for profile in profiles:
-        try:
-            profile_name = profile.get('name', 'Unknown')
-            profile_id = profile.get('id', 'Unknown')
-            tag_line = profile.get('tagLine', '')
-            short_description = profile.get('descriptionShort', '')
-            logo_url = profile.get('logo')
-            profile_status = profile.get('profileStatus', {})
-            status_name = profile_status.get('name', 'Unknown')
-            sector = profile.get('profileSector', {}).get('name', 'Uncategorized')
-
-            socials = profile.get('root', {}).get('socials', [])
-            twitter_handle = ''
-            twitter_url = ''
-            if socials:
-                twitter_entry = socials[0]
-                twitter_name = twitter_entry.get('name', '')
-                if twitter_name:
-                    twitter_handle = f"@{twitter_name}"
-                urls = twitter_entry.get('urls', [])
-                if urls:
-                    twitter_url = urls[0].get('url', '')
-
-            root_data = profile.get('root', {})
-            products = root_data.get('products', [])
-            has_main_product = False
-            product_type = "ASSETS"  # Default to ASSETS if no products exist
-
-            if isinstance(products, list) and products:
-                has_main_product = any(product.get('isMainProduct') == 1 for product in products)
-                if has_main_product:
-                    main_product = next((product for product in products if product.get('isMainProduct') == 1), None)
-                    product_type = main_product.get('productType', {}).get('name', 'N/A') if main_product else "N/A"
-                else:
-                    product_type = products[0].get('productType', {}).get('name', 'N/A')
-
-            # Handle logo download
-            logo_content = download_logo(logo_url)
-            if logo_content:
-                parsed_url = urlparse(logo_url)
-                file_ext = os.path.splitext(parsed_url.path)[1]
-                safe_filename = "".join([c for c in profile_name if c.isalnum() or c == ' ']).rstrip()
-                new_filename = f"{safe_filename}_{profile_id}{file_ext}"
-                logos[f"{sector}/{product_type}/{new_filename}"] = logo_content  # Updated path
-            else:
-                new_filename = None
-
-            # Add to tree structure
-            tree[sector][product_type]['profiles'].append({
-                'id': profile_id,
-                'name': profile_name,
-                'tagLine': tag_line,
-                'descriptionShort': short_description,
-                'status': status_name,
-                'logo': new_filename,
-                'product_type': product_type,
-                'has_main_product': "Yes" if has_main_product else "No",
-                'twitter_handle': twitter_handle,
-                'twitter_url': twitter_url
-            })
-
-            # Add to results for summary
-            results.append((profile_name, profile_id, status_name, sector, product_type, bool(new_filename)))
-
-            # Add to CSV data
-            csv_data.append({
-                'name': profile_name,
-                'gridid': profile_id,
-                'tagLine': tag_line,
-                'descriptionShort': short_description,
-                'sector': sector,
-                'status_name': status_name,
-                'product_type': product_type,
-                'has_main_product': "Yes" if has_main_product else "No",
-                'logo_url': logo_url,
-                'Twitter handle': twitter_handle,
-                'Twitter URL': twitter_url
-            })
-
-            # Update sector counts
-            sector_counts[sector] += 1
-
-        except Exception as e:
-            skipped_items.append({
-                'id': profile.get('id', 'Unknown ID'),
-                'name': profile.get('name', 'Unknown Name'),
-                'reason': str(e)
-            })
-
-    return tree, skipped_items, logos, results, csv_data, sector_counts
-
-def download_logo(logo_url):
-
-    if not logo_url:
-        return None
-    try:
-        response = requests.get(logo_url)
-        if response.status_code == 200:
-            return response.content
+    sector_index = defaultdict(lambda: {'rows': [], 'results': [], 'logos': {}})  # sector -> its share of csv_data, results and logos
+
+    # First pass parses every profile and queues its logo download; the second
+    # pass collects the downloads in profile order so the output matches a serial run.
+    entries = []
+    with LogoDownloader(max_workers=max_workers, timeout=timeout, download=download) as downloader:
+        for profile in profiles:
+            # Only the id and name are kept for skip reporting, so each raw profile is freed once parsed
+            identity = (profile.get('id', 'Unknown ID'), profile.get('name', 'Unknown Name'))
+            try:
+                entry = parse_profile(profile)
+                entries.append((identity, entry, downloader.submit(entry.logo_url), None))
+            except Exception as e:
+                entries.append((identity, None, None, e.with_traceback(None)))  # the traceback would hold the profile
+
+        for (profile_id, profile_name), entry, logo_future, error in entries:
+            try:
+                if error is not None:
+                    raise error
+                add_profile(entry, logo_future.result(), tree, logos, results, csv_data, sector_counts, sector_index)
+            except Exception as e:
+                skipped_items.append({
+                    'id': profile_id,
+                    'name': profile_name,
+                    'reason': str(e)
+                })
+
+    return tree, skipped_items, logos, results, csv_data, sector_counts, sector_index
+
+@timed("process")
+def process_data_to_archive(data, zip_file, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT, queue_size=DEFAULT_QUEUE_SIZE, download=download_logo):
+
+    # Pipeline variant of process_data: logos are written into zip_file as they
+    # arrive and only their paths are kept, so memory is bounded by queue_size.
+    tree = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))  # sector -> product_type -> profiles
+    logos = ArchiveLogoSink(zip_file)
+    results = []
+    csv_data = []
+    sector_counts = defaultdict(int)
+    sector_index = defaultdict(lambda: {'rows': [], 'results': [], 'logos': ArchiveLogoSink()})
+
+    skipped_items = run_pipeline(
+        iter_pages(data),
+        parse_profile,
+        lambda entry, logo_content: add_profile(entry, logo_content, tree, logos, results, csv_data, sector_counts, sector_index),
+        max_workers=max_workers, timeout=timeout, queue_size=queue_size, download=download
+    )
+
+    return tree, skipped_items, logos, results, csv_data, sector_counts, sector_index
+
+def parse_profile(profile):
+
+    profile_name = profile.get('name', 'Unknown')
+    profile_id = profile.get('id', 'Unknown')
+    tag_line = profile.get('tagLine', '')
+    short_description = profile.get('descriptionShort', '')
+    logo_url = profile.get('logo')
+    profile_status = profile.get('profileStatus', {})
+    status_name = profile_status.get('name', 'Unknown')
+    sector = profile.get('profileSector', {}).get('name', 'Uncategorized')
+
+    socials = profile.get('root', {}).get('socials', [])
+    twitter_handle = ''
+    twitter_url = ''
+    if socials:
+        twitter_entry = socials[0]
+        twitter_name = twitter_entry.get('name', '')
+        if twitter_name:
+            twitter_handle = f"@{twitter_name}"
+        urls = twitter_entry.get('urls', [])
+        if urls:
+            twitter_url = urls[0].get('url', '')
+
+    root_data = profile.get('root', {})
+    products = root_data.get('products', [])
+    has_main_product = False
+    product_type = "ASSETS"  # Default to ASSETS if no products exist
+
+    if isinstance(products, list) and products:
+        has_main_product = any(product.get('isMainProduct') == 1 for product in products)
+        if has_main_product:
+            main_product = next((product for product in products if product.get('isMainProduct') == 1), None)
+            product_type = main_product.get('productType', {}).get('name', 'N/A') if main_product else "N/A"
         else:
-            print(f"Failed to download logo from {logo_url}")
-            return None
-    except Exception as e:
-        print(f"Error downloading logo from {logo_url}: {str(e)}")
-        return None
\ No newline at end of file
+            product_type = products[0].get('productType', {}).get('name', 'N/A')
+
+    return ProfileRecord(
+        id=profile_id,
+        name=profile_name,
+        tagLine=tag_line,
+        descriptionShort=short_description,
+        logo_url=logo_url,
+        status=status_name,
+        sector=sector,
+        product_type=product_type,
+        has_main_product=has_main_product,
+        twitter_handle=twitter_handle,
+        twitter_url=twitter_url
+    )
+
+def add_profile(entry, logo_content, tree, logos, results, csv_data, sector_counts, sector_index):
+
+    sector = entry.sector
+    product_type = entry.product_type
+
+    # Handle logo download
+    if logo_content:
+        parsed_url = urlparse(entry.logo_url)
+        file_ext = os.path.splitext(parsed_url.path)[1]
+        safe_filename = "".join([c for c in entry.name if c.isalnum() or c == ' ']).rstrip()
+        entry.logo = f"{safe_filename}_{entry.id}{file_ext}"
+        logo_path = f"{sector}/{product_type}/{entry.logo}"
+        logos[logo_path] = logo_content  # Updated path
+
+    # The same record backs the tree, the summary results and the CSV rows
+    tree[sector][product_type]['profiles'].append(entry)
+    results.append(entry)
+    csv_data.append(entry)
+
+    sector_entry = sector_index[sector]
+    sector_entry['results'].append(entry)
+    sector_entry['rows'].append(entry)
+    if entry.logo:
+        sector_entry['logos'][logo_path] = logo_content
+
+    # Update sector counts
+    sector_counts[sector] += 1
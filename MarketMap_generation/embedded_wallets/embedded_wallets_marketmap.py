@@ -1,15 +1,34 @@
 import requests
 import csv
 import os
-import zipfile
+import sys
 import io
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from urllib.parse import urlparse
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from MarketMap_generation.archive_writer import open_archive
+from MarketMap_generation.checkpoint import Checkpoint
+from MarketMap_generation.graphql_cache import cached_post
+from MarketMap_generation.logo_cache import fetch_logo
+from MarketMap_generation.logo_failures import should_skip, record_failure, record_success, error_status, miss_reason
+
 GRAPHQL_URL = "https://thegriddev.node.thegrid.id/graphql"
 JWT_TOKEN = os.getenv("jwt_dev")
 
+# Profile ID lookups are split into chunks that run concurrently and retry independently.
+# Each attempt already goes through http_client's own retries, so a chunk is only
+# attempted again after those ran out on a transport error or a 5xx.
+ID_CHUNK_SIZE = 100
+ID_LOOKUP_WORKERS = 4
+ID_CHUNK_RETRIES = 2
+
 # GraphQL query to get company profile information including logos
 COMPANY_QUERY = """
 query GetCompanyProfiles($profileIds: [String1!]) {
@@ -60,12 +79,23 @@ def execute_graphql_query(
     Sends a GraphQL query to the specified URL (or default GRAPHQL_URL).
     Returns the parsed 'data' object (or None on error).
     """
+    data, _ = post_graphql_query(query, variables, url)
+    return data
+
+def post_graphql_query(
+    query: str, variables: dict = None, url: str = None
+) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    execute_graphql_query, also telling whether a failure is transient.
+    Returns (data, False) on success, (None, True) after a transport error or a
+    5xx answer, and (None, False) for failures a retry would repeat (no JWT,
+    4xx, GraphQL errors, unexpected payload).
+    """
     target_url = url or GRAPHQL_URL
-    payload = {"query": query, "variables": variables}
     
     if not JWT_TOKEN:
         print("❌ JWT token not found. Please set the 'jwt_dev' environment variable.")
-        return None
+        return None, False
     
     headers = {
         "Content-Type": "application/json",
@@ -76,13 +106,13 @@ def execute_graphql_query(
         print(f"🔐 Making GraphQL request to: {target_url}")
         print(f"📤 Variables: {variables}")
         
-        response = requests.post(target_url, json=payload, headers=headers, timeout=30)
+        response = cached_post(target_url, query, variables, headers=headers, timeout=30)
         print(f"📡 Response status: {response.status_code}")
         
         if response.status_code != 200:
             print(f"❌ HTTP Error: {response.status_code}")
             print(f"📄 Response content: {response.text[:500]}")
-            return None
+            return None, response.status_code >= 500
 
         try:
             data = response.json()
@@ -91,43 +121,48 @@ def execute_graphql_query(
             if "errors" in data:
                 error_msg = f"GraphQL errors: {data['errors']}"
                 print(f"❌ {error_msg}")
-                return None
+                return None, False
 
             if "data" not in data:
                 print(f"❌ No 'data' field in response: {data}")
-                return None
+                return None, False
                 
             if "profileInfos" not in data["data"]:
                 print(f"❌ No 'profileInfos' in data: {data['data'].keys()}")
-                return None
+                return None, False
                 
             profile_count = len(data["data"]["profileInfos"])
             print(f"✅ Found {profile_count} profiles")
-            return data.get("data")
+            return data.get("data"), False
 
         except ValueError as e:
             error_msg = f"Failed to parse JSON response: {e}"
             print(f"❌ {error_msg}")
             print(f"📄 Raw response: {response.text[:500]}")
-            return None
+            return None, False
 
     except requests.RequestException as e:
         error_msg = f"GraphQL request failed: {e}"
         print(f"❌ {error_msg}")
-        return None
+        return None, True
 
 def download_logo(logo_url: str) -> Optional[bytes]:
     """Download logo from URL and return the content as bytes."""
     if not logo_url:
         return None
+    if should_skip(logo_url):
+        return None
     try:
-        response = requests.get(logo_url, timeout=30)
-        if response.status_code == 200:
-            return response.content
+        content, status_code = fetch_logo(logo_url, timeout=30)
+        if content is not None:
+            record_success(logo_url)
+            return content
         else:
-            print(f"Failed to download logo from {logo_url}: Status {response.status_code}")
+            record_failure(logo_url, status_code)
+            print(f"Failed to download logo from {logo_url}: Status {status_code}")
             return None
     except Exception as e:
+        record_failure(logo_url, error_status(e))
         print(f"Error downloading logo from {logo_url}: {str(e)}")
         return None
 
@@ -178,8 +213,37 @@ def process_csv_data(csv_file_path: str) -> Dict[str, list]:
     
     return companies_by_segment
 
-def fetch_company_profiles(companies_by_segment: Dict[str, list]) -> Dict[str, Any]:
-    """Fetch company profile information from the GraphQL endpoint."""
+def fetch_profile_chunk(profile_ids: List[str], max_retries: int = ID_CHUNK_RETRIES) -> Optional[list]:
+    """
+    Fetch one chunk of profiles by ID, retrying transport errors and 5xx answers
+    with exponential backoff. Returns the chunk's profileInfos, or None once
+    every attempt failed or on a failure a retry would repeat.
+    """
+    for attempt in range(1, max_retries + 1):
+        result, transient = post_graphql_query(COMPANY_QUERY, {"profileIds": profile_ids})
+        if result and 'profileInfos' in result:
+            return result['profileInfos']
+        if not transient:
+            return None
+        if attempt < max_retries:
+            delay = 2 ** (attempt - 1) + random.uniform(0, 0.5)
+            print(f"🔁 Chunk of {len(profile_ids)} IDs failed (attempt {attempt}/{max_retries}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+    return None
+
+def fetch_company_profiles(
+    companies_by_segment: Dict[str, list],
+    chunk_size: int = ID_CHUNK_SIZE,
+    max_workers: int = ID_LOOKUP_WORKERS,
+    max_retries: int = ID_CHUNK_RETRIES,
+    checkpoint: Optional[Checkpoint] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch company profile information from the GraphQL endpoint.
+    IDs are looked up in chunks of `chunk_size` on `max_workers` threads; a chunk
+    that still fails after `max_retries` attempts is reported and skipped.
+    With a `checkpoint`, chunks fetched by an interrupted run are reused.
+    """
     all_profile_ids = []
     for companies in companies_by_segment.values():
         for company in companies:
@@ -204,22 +268,43 @@ def fetch_company_profiles(companies_by_segment: Dict[str, list]) -> Dict[str, A
         print("❌ No valid profile IDs after filtering")
         return {}
     
-    variables = {"profileIds": all_profile_ids}
-    print(f"📤 Sending variables: {variables}")
-    print(f"📊 Variables type: {type(variables)}")
-    print(f"📋 Profile IDs type: {type(variables['profileIds'])}")
-    print(f"📊 Sending {len(all_profile_ids)} profile IDs to GraphQL")
+    # Duplicate rows share a lookup; order is kept so chunks are deterministic
+    all_profile_ids = list(dict.fromkeys(all_profile_ids))
+    chunks = [all_profile_ids[i:i + chunk_size] for i in range(0, len(all_profile_ids), chunk_size)]
+    print(f"📊 Sending {len(all_profile_ids)} profile IDs to GraphQL in {len(chunks)} chunk(s) of up to {chunk_size}")
+    
+    profile_infos = []
+    failed_chunks = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if checkpoint is None:
+            futures = {executor.submit(fetch_profile_chunk, chunk, max_retries): index for index, chunk in enumerate(chunks)}
+        else:
+            futures = {
+                executor.submit(checkpoint.step, "profileIds:" + ",".join(chunk), lambda chunk=chunk: fetch_profile_chunk(chunk, max_retries)): index
+                for index, chunk in enumerate(chunks)
+            }
+        chunk_results = {}
+        for future in as_completed(futures):
+            index = futures[future]
+            profiles = future.result()
+            if profiles is None:
+                failed_chunks.append(index)
+            else:
+                chunk_results[index] = profiles
+    
+    # Merge in chunk order so the result does not depend on completion order
+    for index in sorted(chunk_results):
+        profile_infos.extend(chunk_results[index])
     
-    result = execute_graphql_query(COMPANY_QUERY, variables)
+    if failed_chunks:
+        failed_ids = sum(len(chunks[index]) for index in failed_chunks)
+        print(f"⚠️ {len(failed_chunks)} of {len(chunks)} chunks failed after {max_retries} attempts ({failed_ids} profile IDs skipped)")
     
-    if not result:
+    if not chunk_results:
         print("❌ No result returned from GraphQL query")
         return {}
-        
-    if 'profileInfos' not in result:
-        print(f"❌ No 'profileInfos' in result. Available keys: {list(result.keys())}")
-        return {}
     
+    result = {'profileInfos': profile_infos}
     profile_count = len(result['profileInfos'])
     print(f"✅ Successfully fetched {profile_count} profiles from GraphQL")
     print(f"📊 GraphQL returned {profile_count} profiles out of {len(all_profile_ids)} requested")
@@ -229,10 +314,11 @@ def fetch_company_profiles(companies_by_segment: Dict[str, list]) -> Dict[str, A
     
     return result
 
-def process_profiles_and_download_logos(profile_data: Dict[str, Any], companies_by_segment: Dict[str, list]) -> Dict[str, Any]:
+def process_profiles_and_download_logos(profile_data: Dict[str, Any], companies_by_segment: Dict[str, list], download=download_logo) -> Dict[str, Any]:
     """Process profile data and download logos, organizing by segment."""
     logos_by_segment = {}
     company_info_by_segment = {}
+    downloaded_logos = {}  # logo URL -> content, so a company listed in several segments is fetched once
     
     # Create a mapping from profile ID to profile data
     profile_id_to_profile = {}
@@ -271,7 +357,9 @@ def process_profiles_and_download_logos(profile_data: Dict[str, Any], companies_
             # Download logo
             logo_content = None
             if logo_url:
-                logo_content = download_logo(logo_url)
+                if logo_url not in downloaded_logos:
+                    downloaded_logos[logo_url] = download(logo_url)
+                logo_content = downloaded_logos[logo_url]
             
             # Always add company to company_info_by_segment, regardless of logo status
             if logo_content:
@@ -309,7 +397,7 @@ def process_profiles_and_download_logos(profile_data: Dict[str, Any], companies_
                     'status': profile.get('profileStatus', {}).get('name', 'Unknown') if profile.get('profileStatus') else 'Unknown'
                 })
                 
-                print(f"✗ Failed to download logo for {company_name} ({segment})")
+                print(f"✗ Failed to download logo for {company_name} ({segment}): {miss_reason(logo_url)}")
     
     return {
         'logos': logos_by_segment,
@@ -333,17 +421,18 @@ def create_zip_file(logos_by_segment: Dict[str, Any], company_info_by_segment: D
         logo_count = len(logos_by_segment.get(segment, {}))
         print(f"   {segment} → {sanitized}/ ({company_count} companies, {logo_count} logos)")
     
-    # Create zip buffer
-    zip_buffer = io.BytesIO()
+    output_dir = "embedded_wallets/outputs"
+    zip_path = os.path.join(output_dir, zip_filename)
     
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+    # Stream entries straight into the output file
+    with open_archive(zip_path) as zip_file:
         # Add logos organized by segment
         for segment, logos in logos_by_segment.items():
             if logos:
                 sanitized_segment = sanitize_folder_name(segment)
                 for filename, logo_content in logos.items():
-                    zip_path = f"{sanitized_segment}/{filename}"
-                    zip_file.writestr(zip_path, logo_content)
+                    arcname = f"{sanitized_segment}/{filename}"
+                    zip_file.writelogo(arcname, logo_content)
         
         # Add company information CSV for each segment
         for segment, companies in company_info_by_segment.items():
@@ -356,18 +445,9 @@ def create_zip_file(logos_by_segment: Dict[str, Any], company_info_by_segment: D
         summary_csv = create_summary_csv(company_info_by_segment)
         zip_file.writestr("summary.csv", summary_csv)
         
-        # Add original CSV file
+        # Add original CSV file; read in text mode (newlines normalised to LF) and copied into the entry in chunks
         with open(csv_file_path, 'r', encoding='utf-8') as f:
-            original_csv_content = f.read()
-        zip_file.writestr("original_data.csv", original_csv_content)
-    
-    # Save zip file
-    output_dir = "embedded_wallets/outputs"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    zip_path = os.path.join(output_dir, zip_filename)
-    with open(zip_path, 'wb') as f:
-        f.write(zip_buffer.getvalue())
+            zip_file.writetext("original_data.csv", lambda stream: shutil.copyfileobj(f, stream))
     
     print(f"✓ ZIP file created: {zip_path}")
     return zip_path
@@ -417,9 +497,12 @@ def main():
         for segment, companies in companies_by_segment.items():
             print(f"   {segment}: {len(companies)} companies")
         
+        # Fetched chunks and downloaded logos are kept until the zip exists, so a rerun resumes
+        checkpoint = Checkpoint("embedded_wallets")
+
         # Step 2: Fetch company profiles from GraphQL
         print("\n🔍 Fetching company profiles from GraphQL...")
-        profile_data = fetch_company_profiles(companies_by_segment)
+        profile_data = fetch_company_profiles(companies_by_segment, checkpoint=checkpoint)
         
         if not profile_data:
             print("❌ Failed to fetch company profiles")
@@ -427,7 +510,7 @@ def main():
         
         # Step 3: Process profiles and download logos
         print("\n🖼️  Processing profiles and downloading logos...")
-        processed_data = process_profiles_and_download_logos(profile_data, companies_by_segment)
+        processed_data = process_profiles_and_download_logos(profile_data, companies_by_segment, checkpoint.wrap_download(download_logo))
         
         # Step 4: Create zip file
         print("\n📦 Creating zip file...")
@@ -436,6 +519,7 @@ def main():
             processed_data['company_info'], 
             csv_file_path
         )
+        checkpoint.finish()
         
         # Step 5: Print summary
         print("\n✅ Marketmap generation completed successfully!")
@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+from MarketMap_generation.http_client import request
+from MarketMap_generation.instrumentation import record
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.getenv("MM_CACHE_DIR", os.path.join(REPO_ROOT, ".cache"))
+GRAPHQL_CACHE_DIR = os.path.join(CACHE_DIR, "graphql")
+
+# MM_GRAPHQL_CACHE_TTL (seconds) controls reuse; 0 disables the cache.
+# MM_REFRESH_CACHE=1 ignores stored responses but still refreshes them.
+DEFAULT_TTL = int(os.getenv("MM_GRAPHQL_CACHE_TTL", str(6 * 60 * 60)))
+FORCE_REFRESH = os.getenv("MM_REFRESH_CACHE", "").lower() in ("1", "true", "yes")
+
+def cache_key(url, query, variables=None):
+    payload = json.dumps([url, query, variables], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _cache_path(key):
+    return os.path.join(GRAPHQL_CACHE_DIR, f"{key}.json.gz")
+
+def open_cached(url, query, variables=None, ttl=DEFAULT_TTL):
+    """Return a binary stream over the cached response body if it is younger than `ttl`, else None."""
+    if ttl <= 0:
+        return None
+    path = _cache_path(cache_key(url, query, variables))
+    try:
+        age = time.time() - os.path.getmtime(path)
+        if age > ttl:
+            return None
+        stream = gzip.open(path, "rb")
+    except OSError:
+        return None
+    print(f"Using cached GraphQL response ({age:.0f}s old)")
+    return stream
+
+def load_cached(url, query, variables=None, ttl=DEFAULT_TTL):
+    """Return the cached response body (bytes) if it is younger than `ttl`, else None."""
+    stream = open_cached(url, query, variables, ttl)
+    if stream is None:
+        return None
+    try:
+        with stream:
+            return stream.read()
+    except (OSError, EOFError):
+        return None
+
+def store_cached(url, query, variables, body):
+    os.makedirs(GRAPHQL_CACHE_DIR, exist_ok=True)
+    path = _cache_path(cache_key(url, query, variables))
+    fd, tmp_path = tempfile.mkstemp(dir=GRAPHQL_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class CacheWriter:
+    """Writes a response body into the cache chunk by chunk.
+
+    The entry only becomes visible on commit(), so callers commit once the
+    body is complete and valid and abort() otherwise.
+    """
+
+    def __init__(self, url, query, variables=None):
+        os.makedirs(GRAPHQL_CACHE_DIR, exist_ok=True)
+        self.path = _cache_path(cache_key(url, query, variables))
+        fd, self.tmp_path = tempfile.mkstemp(dir=GRAPHQL_CACHE_DIR, suffix=".tmp")
+        self._raw = os.fdopen(fd, "wb")
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+
+    def write(self, chunk):
+        self._gzip.write(chunk)
+
+    def _close(self):
+        self._gzip.close()
+        self._raw.close()
+
+    def commit(self):
+        self._close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+def _is_cacheable(response):
+    if response.status_code != 200:
+        return False
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    return isinstance(data, dict) and "data" in data and not data.get("errors")
+
+def cached_post(url, query, variables=None, headers=None, timeout=None, ttl=DEFAULT_TTL, force_refresh=FORCE_REFRESH):
+    """POST a GraphQL query, serving a recent successful response from disk when available.
+
+    Returns a requests.Response either way, so callers keep their status and
+    JSON handling unchanged.
+    """
+    if not force_refresh:
+        body = load_cached(url, query, variables, ttl)
+        if body is not None:
+            record("graphql_cache", nbytes=len(body))
+            response = requests.Response()
+            response.status_code = 200
+            response._content = body
+            response.encoding = "utf-8"
+            response.url = url
+            return response
+
+    payload = {"query": query}
+    if variables is not None:
+        payload["variables"] = variables
+    started = time.perf_counter()
+    response = request("POST", url, json=payload, headers=headers, timeout=timeout)
+    record("graphql", seconds=time.perf_counter() - started, nbytes=len(response.content), failed=response.status_code != 200)
+
+    if ttl > 0 and _is_cacheable(response):
+        try:
+            store_cached(url, query, variables, response.content)
+        except OSError as e:
+            print(f"Could not write GraphQL cache: {str(e)}")
+    return response
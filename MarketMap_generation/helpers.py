@@ -1,102 +1,137 @@
 import csv
 import os
-import zipfile
 from datetime import datetime
 import io
 
+from MarketMap_generation.archive_writer import open_archive
+from MarketMap_generation.logo_failures import miss_reason, miss_summary
+from MarketMap_generation.logo_normalizer import normalize_logos
+
 def generate_csv_content(csv_data):
 
     output = io.StringIO()
     fieldnames = ['name', 'gridid', 'tagLine', 'descriptionShort', 'sector', 'status_name', 'product_type', 'has_main_product', 'logo_url', 'Twitter handle', 'Twitter URL']
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    writer.writeheader()
-    for row in csv_data:
-        writer.writerow(row)
+    writer = csv.writer(output)
+    writer.writerow(fieldnames)
+    for record in csv_data:
+        writer.writerow(record.row(fieldnames))
     return output.getvalue()
 
 def create_zip_file(logos, results_content, csv_content, version):
 
     current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
     zip_filename = f'mm_solana_grid_data_v{version}_{current_time}.zip'
-    zip_buffer = io.BytesIO()
+    zip_path = os.path.join(f'../Outputs/v{version}', zip_filename)
 
-    with zipfile.ZipFile(zip_buffer, 'a', zipfile.ZIP_DEFLATED, False) as zip_file:
-        for filepath, content in logos.items():
-            zip_file.writestr(filepath, content)  # filepath includes sector/product_type/
+    with open_archive(zip_path) as zip_file:
+        for filepath, content in normalize_logos(logos):
+            zip_file.writelogo(filepath, content)  # filepath includes sector/product_type/
 
-        zip_file.writestr(f'solana_results_v{version}_{current_time}.txt', results_content)
+        zip_file.writetext(f'solana_results_v{version}_{current_time}.txt', results_content)
         zip_file.writestr(f'solana_folder_contents_v{version}_{current_time}.csv', csv_content)
 
-    os.makedirs(f'../Outputs/v{version}', exist_ok=True)
+    print(f"ZIP file created at: {zip_path}")
+    return zip_filename
+
+def create_streamed_zip_file(write_logos, version):
+
+    # Same archive as create_zip_file, but write_logos(zip_file) adds the logos itself
+    # (e.g. process_data_to_archive) and returns (results_content, csv_content) afterwards.
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    zip_filename = f'mm_solana_grid_data_v{version}_{current_time}.zip'
     zip_path = os.path.join(f'../Outputs/v{version}', zip_filename)
-    with open(zip_path, 'wb') as f:
-        f.write(zip_buffer.getvalue())
+
+    with open_archive(zip_path) as zip_file:
+        results_content, csv_content = write_logos(zip_file)
+
+        zip_file.writetext(f'solana_results_v{version}_{current_time}.txt', results_content)
+        zip_file.writestr(f'solana_folder_contents_v{version}_{current_time}.csv', csv_content)
 
     print(f"ZIP file created at: {zip_path}")
     return zip_filename
 
-def generate_results_content(tree, results, skipped, logo_count, sector_counts):
+def write_results_content(stream, tree, results, skipped, logo_count, sector_counts):
 
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     total_profiles = len(results)
     skipped_count = len(skipped)
 
-    content = f"""
+    stream.write(f"""
 GRID DATA EXPORT SUMMARY
 ========================
 Date and Time: {current_time}
 Total Profiles Processed: {total_profiles}
 Total Logos: {logo_count}
+Missing Logos: {miss_summary(results)}
 Skipped Profiles: {skipped_count}
 
 Folder Structure:
-"""
+""")
     for sector, product_types in tree.items():
-        content += f"{sector}/\n"
+        stream.write(f"{sector}/\n")
         for product_type, subfolders in product_types.items():
-            content += f"  {product_type}/\n"
+            stream.write(f"  {product_type}/\n")
             for subfolder, profiles in subfolders.items():
-                content += f"    {subfolder}/ ({len(profiles)} profiles)\n"
+                stream.write(f"    {subfolder}/ ({len(profiles)} profiles)\n")
 
-    content += "\nProcessed Profiles:\n"
-    content += "Name                 ID        Status       Sector                         ProductType      Logo\n"
-    content += "-" * 90 + "\n"
-    for result in results:
-        name, id_, status_name, sector, product_type, logo_success = result
-        content += f"{name:<20} {id_:<9} {status_name:<12} {sector:<30} {product_type:<15} {'✓' if logo_success else '✗'}\n"
+    stream.write("\nProcessed Profiles:\n")
+    stream.write("Name                 ID        Status       Sector                         ProductType      Logo\n")
+    stream.write("-" * 90 + "\n")
+    for record in results:
+        stream.write(f"{record.name:<20} {record.id:<9} {record.status:<12} {record.sector:<30} {record.product_type:<15} {'✓' if record.logo_success else '✗ ' + miss_reason(record.logo_url)}\n")
 
-    content += "\nSkipped Profiles:\n"
+    stream.write("\nSkipped Profiles:\n")
     for item in skipped:
-        content += f"- ID: {item['id']}, Name: {item['name']}, Reason: {item['reason']}\n"
+        stream.write(f"- ID: {item['id']}, Name: {item['name']}, Reason: {item['reason']}\n")
+
+def generate_results_content(tree, results, skipped, logo_count, sector_counts):
+
+    output = io.StringIO()
+    write_results_content(output, tree, results, skipped, logo_count, sector_counts)
+    return output.getvalue()
 
-    return content
+def results_writer(tree, results, skipped, logo_count, sector_counts):
 
-def filter_by_sector(tree, csv_data, logos, results, specific_sector):
+    # Deferred summary for the create_* functions: rendered straight into the archive entry
+    return lambda stream: write_results_content(stream, tree, results, skipped, logo_count, sector_counts)
+
+def filter_by_sector(tree, csv_data, logos, results, specific_sector, sector_index=None):
 
     filtered_tree = {specific_sector: tree.get(specific_sector, {})}
-    filtered_data = [row for row in csv_data if row['sector'] == specific_sector]
+    if sector_index is not None:
+        # process_data already partitioned rows, results and logos by sector; reuse them as-is
+        sector_entry = sector_index.get(specific_sector, {'rows': [], 'results': [], 'logos': {}})
+        return filtered_tree, sector_entry['rows'], sector_entry['logos'], sector_entry['results']
+
+    filtered_data = [record for record in csv_data if record.sector == specific_sector]
     filtered_logos = {path: content for path, content in logos.items() if path.startswith(f"{specific_sector}/")}
-    filtered_results = [result for result in results if result[3] == specific_sector]
+    filtered_results = [record for record in results if record.sector == specific_sector]
     return filtered_tree, filtered_data, filtered_logos, filtered_results
 
 def create_sector_based_output(logos, results_content, csv_content, tree, version, specific_sector):
 
     current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
     zip_filename = f'mm_solana_sector_{specific_sector}_data_v{version}_{current_time}.zip'
-    zip_buffer = io.BytesIO()
+    zip_path = os.path.join(f'../Outputs/v{version}', zip_filename)
 
-    with zipfile.ZipFile(zip_buffer, 'a', zipfile.ZIP_DEFLATED, False) as zip_file:
-        zip_file.writestr(f'solana_results_v{version}_{current_time}.txt', results_content)
+    with open_archive(zip_path) as zip_file:
+        zip_file.writetext(f'solana_results_v{version}_{current_time}.txt', results_content)
         zip_file.writestr(f'solana_folder_contents_v{version}_{current_time}.csv', csv_content)
 
-        for filepath, content in logos.items():
-            if filepath.startswith(f"{specific_sector}/"):
-                zip_file.writestr(filepath, content)  # filepath includes sector/product_type/
-
-    os.makedirs(f'../Outputs/v{version}', exist_ok=True)
-    zip_path = os.path.join(f'../Outputs/v{version}', zip_filename)
-    with open(zip_path, 'wb') as f:
-        f.write(zip_buffer.getvalue())
+        for filepath, content in normalize_logos(logos):  # logos are already filtered to specific_sector
+            zip_file.writelogo(filepath, content)  # filepath includes sector/product_type/
 
     print(f"Sector-based ZIP file created at: {zip_path}")
-    return zip_filename
\ No newline at end of file
+    return zip_filename
+
+def create_all_sector_outputs(tree, csv_data, logos, results, skipped_items, sector_counts, version, sector_index=None):
+
+    # Every sector archive is built from the same fetched data. Logos are stored uncompressed,
+    # so the writes are I/O bound and run one after the other (a thread pool measured no faster).
+    def build_sector_output(specific_sector):
+        filtered_tree, filtered_data, filtered_logos, filtered_results = filter_by_sector(tree, csv_data, logos, results, specific_sector, sector_index)
+        results_content = results_writer(filtered_tree, filtered_results, skipped_items, len(filtered_logos), {specific_sector: len(filtered_results)})
+        csv_content = generate_csv_content(filtered_data)
+        return create_sector_based_output(filtered_logos, results_content, csv_content, filtered_tree, version, specific_sector)
+
+    return [build_sector_output(specific_sector) for specific_sector in sector_counts]
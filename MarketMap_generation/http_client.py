@@ -0,0 +1,126 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from MarketMap_generation.instrumentation import record
+from MarketMap_generation.rate_limiter import get_limiter
+
+DEFAULT_POOL_CONNECTIONS = 10  # number of hosts kept in the pool
+DEFAULT_POOL_MAXSIZE = 32      # keep-alive connections per host, should cover the logo worker count
+
+# Transient answers are retried MM_HTTP_RETRIES times with jittered exponential backoff.
+DEFAULT_MAX_RETRIES = int(os.getenv("MM_HTTP_RETRIES", "3"))
+BACKOFF_BASE = 0.5        # seconds, doubled per attempt
+BACKOFF_CAP = 30.0        # longest backoff between two attempts
+MAX_RETRY_AFTER = 120.0   # longer Retry-After values are treated as "give up"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A host that times out or refuses connections is unlikely to recover within a backoff,
+# so transport errors get at most this many retries (and never lower the host's limits).
+MAX_TRANSPORT_RETRIES = 1
+
+_session = None
+_session_lock = threading.Lock()
+
+def build_session(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False):
+    """Create a requests.Session with a keep-alive connection pool per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def configure_session(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False):
+    """Replace the shared session, e.g. to size the pools for a larger worker count."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = build_session(pool_connections, pool_maxsize, pool_block)
+        return _session
+
+def get_session():
+    """Return the process-wide session shared by GraphQL and logo requests."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given (0-based) retry attempt."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+def request(method, url, max_retries=DEFAULT_MAX_RETRIES, **kwargs):
+    """Send a request through the shared session, per-host limiter and retry policy.
+
+    429 and 5xx answers are retried up to `max_retries` times, waiting for
+    the longer of Retry-After and a jittered exponential backoff; connection
+    errors and timeouts are retried at most MAX_TRANSPORT_RETRIES times.
+    Only 429 and Retry-After answers lower the host's limits. The last
+    response is returned (or the last transport error raised) once retries
+    are exhausted, so callers keep their own status handling.
+    """
+    limiter = get_limiter(url)
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            response = get_session().request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            limiter.release(outcome="error")
+            if attempt >= min(max_retries, MAX_TRANSPORT_RETRIES):
+                raise
+            delay = backoff_delay(attempt)
+        except BaseException:
+            # Invalid URLs, redirect loops, broken bodies...: not retried, but the slot must be freed
+            # or a few malformed logo URLs would leave the host's limiter blocked for good
+            limiter.release(outcome="error")
+            raise
+        else:
+            status = response.status_code
+            retry_after = parse_retry_after(response.headers.get("Retry-After")) if status in RETRY_STATUSES else None
+            # Only an explicit "slow down" (429 or a Retry-After) lowers the host's limits;
+            # other 5xx answers are retried at the current pace, without probing upwards
+            if status == 429 or retry_after is not None:
+                outcome = "throttled"
+            elif status in RETRY_STATUSES:
+                outcome = "error"
+            else:
+                outcome = "ok"
+            limiter.release(outcome=outcome, retry_after=retry_after)
+            if status not in RETRY_STATUSES or attempt >= max_retries or (retry_after or 0) > MAX_RETRY_AFTER:
+                return response
+            response.close()
+            delay = max(retry_after or 0.0, backoff_delay(attempt))
+        record("http_retry", seconds=delay)
+        time.sleep(delay)
+        attempt += 1
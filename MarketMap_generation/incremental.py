@@ -0,0 +1,225 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import zipfile
+
+from MarketMap_generation.archive_writer import read_entry
+from MarketMap_generation.graphql_cache import cached_post
+from MarketMap_generation.logo_downloader import download_logo, DEFAULT_TIMEOUT
+
+# Everything process_data reads from a profile is covered by the fingerprint. The
+# lightweight query selects only these fields (with the full query's products and
+# socials arguments), so its fingerprints match those of fully fetched profiles.
+FINGERPRINT_SELECTION = """
+    id
+    name
+    logo
+    tagLine
+    descriptionShort
+    profileStatus {{
+      name
+    }}
+    profileSector {{
+      name
+    }}
+    root {{
+      products{products_arguments} {{
+        isMainProduct
+        productType {{
+          name
+        }}
+      }}
+      socials{socials_arguments} {{
+        name
+        urls {{
+          url
+        }}
+      }}
+    }}
+"""
+FINGERPRINT_FIELDS = ['id', 'name', 'logo', 'tagLine', 'descriptionShort', 'profileStatus', 'profileSector']
+
+DEFAULT_ID_CHUNK_SIZE = 100
+
+def profile_fingerprint(profile):
+    fields = {field: profile.get(field) for field in FINGERPRINT_FIELDS}
+    # Products decide the product type (and so the logo folder), socials the Twitter columns; order matters to both
+    root = profile.get('root') or {}
+    fields['products'] = [
+        [product.get('isMainProduct'), (product.get('productType') or {}).get('name')]
+        for product in root.get('products') or []
+    ]
+    fields['socials'] = [
+        [social.get('name'), [url.get('url') for url in social.get('urls') or []]]
+        for social in root.get('socials') or []
+    ]
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _matching_close(text, start, open_char, close_char):
+    depth = 0
+    for index in range(start, len(text)):
+        if text[index] == open_char:
+            depth += 1
+        elif text[index] == close_char:
+            depth -= 1
+            if depth == 0:
+                return index
+    raise ValueError(f"Unbalanced '{open_char}' in query")
+
+def _split_profile_infos(query):
+    """Return (prefix, arguments, selection, suffix) around the profileInfos field."""
+    field_start = query.index("profileInfos") + len("profileInfos")
+    cursor = field_start
+    while query[cursor].isspace():
+        cursor += 1
+    arguments = ""
+    if query[cursor] == "(":
+        args_end = _matching_close(query, cursor, "(", ")")
+        arguments = query[cursor:args_end + 1]
+        cursor = args_end + 1
+    selection_start = query.index("{", cursor)
+    selection_end = _matching_close(query, selection_start, "{", "}")
+    return query[:field_start], arguments, query[selection_start:selection_end + 1], query[selection_end + 1:]
+
+def _field_arguments(selection, field):
+    """The "(...)" arguments of `field` in a selection set, or "" if it has none."""
+    match = re.search(rf"\b{field}\s*\(", selection)
+    if not match:
+        return ""
+    start = match.end() - 1
+    return selection[start:_matching_close(selection, start, "(", ")") + 1]
+
+def lightweight_query(query):
+    """Same filter as `query`, selecting only the fingerprinted fields."""
+    prefix, arguments, selection, suffix = _split_profile_infos(query)
+    fingerprint_selection = FINGERPRINT_SELECTION.format(
+        products_arguments=_field_arguments(selection, "products"),
+        socials_arguments=_field_arguments(selection, "socials"),
+    )
+    return f"{prefix}{arguments} {{{fingerprint_selection}  }}{suffix}"
+
+def ids_query(query, profile_ids):
+    """Same selection as `query`, restricted to the given profile ids."""
+    prefix, _, selection, suffix = _split_profile_infos(query)
+    id_list = ", ".join(json.dumps(str(profile_id)) for profile_id in profile_ids)
+    return f"{prefix}(where: {{id: {{_in: [{id_list}]}}}}) {selection}{suffix}"
+
+def _post_profiles(url, query):
+    response = cached_post(url, query)
+    if response.status_code != 200:
+        print(f"Response content: {response.text}")
+        raise Exception(f"Query failed with status code: {response.status_code}")
+    data = response.json()
+    if "data" not in data or "profileInfos" not in data["data"]:
+        print("Unexpected response structure:", data)
+        raise Exception("Missing 'profileInfos' in response")
+    return data["data"]["profileInfos"]
+
+def manifest_path_for(zip_path):
+    return f"{os.path.splitext(zip_path)[0]}.manifest.json.gz"
+
+def write_manifest(zip_path, profiles, tree):
+    """Record per-profile fingerprints, raw profiles and logo archive paths next to `zip_path`."""
+    logo_paths = {}
+    for sector, product_types in tree.items():
+        for product_type, subfolders in product_types.items():
+            for profile in subfolders['profiles']:
+                if profile.logo and profile.logo_url:
+                    logo_paths[profile.logo_url] = f"{sector}/{product_type}/{profile.logo}"
+
+    manifest = {
+        'archive': os.path.basename(zip_path),
+        'profiles': {
+            str(profile.get('id')): {'fingerprint': profile_fingerprint(profile), 'profile': profile}
+            for profile in profiles
+        },
+        'logos': logo_paths,
+    }
+    path = manifest_path_for(zip_path)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return path
+
+def load_latest_manifest(output_root, archive_prefix):
+    """Load the newest manifest whose archive name starts with `archive_prefix`, or None."""
+    candidates = glob.glob(os.path.join(output_root, "v*", f"{archive_prefix}*.manifest.json.gz"))
+    if not candidates:
+        return None
+    path = max(candidates, key=os.path.getmtime)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest['archive_path'] = os.path.join(os.path.dirname(path), manifest['archive'])
+    print(f"Incremental baseline: {manifest['archive_path']} ({len(manifest['profiles'])} profiles)")
+    return manifest
+
+def fetch_incremental(url, query, manifest, chunk_size=DEFAULT_ID_CHUNK_SIZE):
+    """Build a full profileInfos response, fetching full records only for changed profiles.
+
+    A lightweight query returns the fingerprinted fields for every profile in
+    the filter; profiles whose fingerprint matches the manifest are carried
+    over as stored, the rest are fetched by id in chunks.
+    """
+    current = _post_profiles(url, lightweight_query(query))
+    previous = manifest['profiles'] if manifest else {}
+
+    changed_ids = [
+        str(profile['id']) for profile in current
+        if str(profile['id']) not in previous or previous[str(profile['id'])]['fingerprint'] != profile_fingerprint(profile)
+    ]
+    changed = set(changed_ids)
+    print(f"Incremental fetch: {len(current) - len(changed_ids)} unchanged, {len(changed_ids)} new or changed")
+
+    fetched = {}
+    for start in range(0, len(changed_ids), chunk_size):
+        for profile in _post_profiles(url, ids_query(query, changed_ids[start:start + chunk_size])):
+            fetched[str(profile['id'])] = profile
+
+    profiles = []
+    for profile in current:
+        profile_id = str(profile['id'])
+        if profile_id in fetched:
+            profiles.append(fetched[profile_id])
+        elif profile_id in previous and profile_id not in changed:
+            profiles.append(previous[profile_id]['profile'])
+    return {'data': {'profileInfos': profiles}}
+
+class CarriedOverDownload:
+    """Download function that reads unchanged logos from the previous archive.
+
+    Holds the previous archive open until close(), so close it once
+    processing is done, before the new archive is written.
+    """
+
+    def __init__(self, manifest):
+        self.previous_archive = None
+        self.logo_paths = {}
+        if manifest and os.path.exists(manifest['archive_path']):
+            self.previous_archive = zipfile.ZipFile(manifest['archive_path'])
+            self.logo_paths = manifest['logos']
+
+    def __call__(self, logo_url, timeout=DEFAULT_TIMEOUT):
+        archive_path = self.logo_paths.get(logo_url)
+        if archive_path and self.previous_archive is not None:
+            try:
+                return read_entry(self.previous_archive, archive_path)
+            except KeyError:
+                pass
+        return download_logo(logo_url, timeout)
+
+    def close(self):
+        if self.previous_archive is not None:
+            self.previous_archive.close()
+            self.previous_archive = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+def carried_over_download(manifest):
+    """Return a CarriedOverDownload for `manifest` (close it once processing is done)."""
+    return CarriedOverDownload(manifest)
@@ -0,0 +1,136 @@
+import functools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then omitted
+    resource = None
+
+# MM_RUN_REPORT=0 stops writing `*.report.json` next to each archive.
+REPORT_ENABLED = os.getenv("MM_RUN_REPORT", "1").lower() not in ("0", "false", "no")
+
+def peak_rss_mb():
+    """High-water resident set size of this process in MB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+class RunReport:
+    """Per-stage timings, byte counts, failures and latencies for one run.
+
+    Stages are recorded from any thread. `seconds` is the summed duration of
+    all calls, so for concurrent stages (e.g. logo downloads) it is busy time
+    rather than wall time; the latency percentiles describe single calls.
+    Peak RSS is reported once for the whole process: ru_maxrss is a
+    process-wide high-water mark and stages overlap, so it says nothing
+    about a single stage.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, name, seconds=None, nbytes=0, failed=False):
+        with self._lock:
+            stage = self._stages.setdefault(name, {'calls': 0, 'failures': 0, 'bytes': 0, 'latencies': []})
+            stage['calls'] += 1
+            stage['bytes'] += nbytes
+            if failed:
+                stage['failures'] += 1
+            if seconds is not None:
+                stage['latencies'].append(seconds)
+
+    def to_dict(self):
+        with self._lock:
+            stages = {}
+            for name, stage in self._stages.items():
+                latencies = sorted(stage['latencies'])
+                seconds = sum(latencies)
+                stages[name] = {
+                    'calls': stage['calls'],
+                    'failures': stage['failures'],
+                    'seconds': round(seconds, 4),
+                    'bytes': stage['bytes'],
+                    'bytes_per_second': round(stage['bytes'] / seconds) if seconds and stage['bytes'] else None,
+                    'latency_ms': {
+                        'p50': _ms(percentile(latencies, 0.50)),
+                        'p90': _ms(percentile(latencies, 0.90)),
+                        'p99': _ms(percentile(latencies, 0.99)),
+                        'max': _ms(latencies[-1] if latencies else None),
+                    },
+                }
+        return {
+            'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+            'started_at': self.started_at,
+            'elapsed_seconds': round(time.perf_counter() - self._started, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages,
+        }
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+_report = RunReport()
+
+def get_report():
+    return _report
+
+def reset_report():
+    """Start a fresh report (the module-level one covers the whole process by default)."""
+    global _report
+    _report = RunReport()
+    return _report
+
+def record(name, seconds=None, nbytes=0, failed=False):
+    _report.record(name, seconds=seconds, nbytes=nbytes, failed=failed)
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as one call of stage `name`; failures are counted."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        record(name, seconds=time.perf_counter() - started, failed=True)
+        raise
+    record(name, seconds=time.perf_counter() - started)
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def report_path_for(zip_path):
+    return f"{os.path.splitext(zip_path)[0]}.report.json"
+
+def write_report(zip_path):
+    """Write the current run report next to `zip_path` and return its path."""
+    report = _report.to_dict()
+    report['archive'] = os.path.basename(zip_path)
+    report['archive_bytes'] = os.path.getsize(zip_path) if os.path.exists(zip_path) else None
+    path = report_path_for(zip_path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
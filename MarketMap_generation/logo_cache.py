@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from MarketMap_generation.graphql_cache import CACHE_DIR
+from MarketMap_generation.http_client import request
+
+LOGO_CACHE_DIR = os.path.join(CACHE_DIR, "logos")
+BLOB_DIR = os.path.join(LOGO_CACHE_DIR, "blobs")  # blobs/<sha256[:2]>/<sha256>, shared by identical logos
+META_DIR = os.path.join(LOGO_CACHE_DIR, "meta")   # meta/<sha256(url)>.json -> blob hash + validators
+
+LOGO_CACHE_ENABLED = os.getenv("MM_LOGO_CACHE", "1").lower() not in ("0", "false", "no")
+# Cached logos younger than this (seconds) are served without revalidating; 0 always revalidates.
+LOGO_CACHE_MAX_AGE = int(os.getenv("MM_LOGO_CACHE_MAX_AGE", "0"))
+
+# URLs fetched or revalidated by this process; later requests for them are served from disk.
+_checked_this_run = set()
+
+def _url_key(logo_url):
+    return hashlib.sha256(logo_url.encode("utf-8")).hexdigest()
+
+def _blob_path(content_hash):
+    return os.path.join(BLOB_DIR, content_hash[:2], content_hash)
+
+def _meta_path(logo_url):
+    return os.path.join(META_DIR, f"{_url_key(logo_url)}.json")
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def load_blob(content_hash):
+    """Return the blob stored under `content_hash`, or None if it is missing or damaged."""
+    try:
+        with open(_blob_path(content_hash), "rb") as f:
+            content = f.read()
+    except OSError:
+        return None
+    if hashlib.sha256(content).hexdigest() != content_hash:
+        return None
+    return content
+
+def store_blob(content):
+    """Store `content` in the blob store (once per distinct content) and return its sha256."""
+    content_hash = hashlib.sha256(content).hexdigest()
+    blob_path = _blob_path(content_hash)
+    if not os.path.exists(blob_path):
+        _write_atomic(blob_path, content)
+    return content_hash
+
+def load_entry(logo_url):
+    """Return (metadata, content) for a cached URL, or (None, None)."""
+    try:
+        with open(_meta_path(logo_url), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(_blob_path(meta["sha256"]), "rb") as f:
+            content = f.read()
+    except (OSError, ValueError, KeyError):
+        return None, None
+    if hashlib.sha256(content).hexdigest() != meta["sha256"]:
+        return None, None
+    return meta, content
+
+def store_entry(logo_url, content, etag=None, last_modified=None):
+    content_hash = store_blob(content)
+    meta = {
+        "url": logo_url,
+        "sha256": content_hash,
+        "etag": etag,
+        "last_modified": last_modified,
+        "checked_at": time.time(),
+    }
+    _write_atomic(_meta_path(logo_url), json.dumps(meta).encode("utf-8"))
+    return meta
+
+def _touch_entry(logo_url, meta):
+    meta = dict(meta, checked_at=time.time())
+    _write_atomic(_meta_path(logo_url), json.dumps(meta).encode("utf-8"))
+
+def fetch_logo(logo_url, timeout=None):
+    """Fetch a logo through the on-disk cache.
+
+    Cached entries are revalidated with If-None-Match / If-Modified-Since and a
+    304 is served from disk; a URL already checked during this run is not
+    requested again. Returns (content, status_code); content is None
+    when the server answered with anything other than 200/304. Transport errors
+    propagate to the caller.
+    """
+    if not LOGO_CACHE_ENABLED:
+        response = request("GET", logo_url, timeout=timeout)
+        return (response.content if response.status_code == 200 else None), response.status_code
+
+    meta, cached = load_entry(logo_url)
+    headers = {}
+    if cached is not None:
+        if logo_url in _checked_this_run or (LOGO_CACHE_MAX_AGE and time.time() - meta.get("checked_at", 0) < LOGO_CACHE_MAX_AGE):
+            return cached, 304
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = request("GET", logo_url, headers=headers, timeout=timeout)
+
+    try:
+        if response.status_code == 304 and cached is not None:
+            _touch_entry(logo_url, meta)
+            _checked_this_run.add(logo_url)
+            return cached, 304
+        if response.status_code == 200:
+            store_entry(logo_url, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            _checked_this_run.add(logo_url)
+            return response.content, 200
+    except OSError as e:
+        print(f"Could not update logo cache for {logo_url}: {str(e)}")
+        if response.status_code == 304:
+            return cached, 304
+        return response.content, response.status_code
+    return None, response.status_code
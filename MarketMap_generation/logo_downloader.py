@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from MarketMap_generation.instrumentation import record
+
+from MarketMap_generation.logo_cache import fetch_logo
+from MarketMap_generation.logo_failures import should_skip, record_failure, record_success, error_status
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_TIMEOUT = 15  # seconds, per request
+
+def download_logo(logo_url, timeout=DEFAULT_TIMEOUT):
+
+    if not logo_url:
+        return None
+    if should_skip(logo_url):
+        record("logo_skipped")
+        return None
+    started = time.perf_counter()
+    try:
+        content, status_code = fetch_logo(logo_url, timeout=timeout)
+        if content is not None:
+            record("logo", seconds=time.perf_counter() - started, nbytes=len(content))
+            record_success(logo_url)
+            return content
+        else:
+            record("logo", seconds=time.perf_counter() - started, failed=True)
+            record_failure(logo_url, status_code)
+            print(f"Failed to download logo from {logo_url}")
+            return None
+    except Exception as e:
+        record("logo", seconds=time.perf_counter() - started, failed=True)
+        record_failure(logo_url, error_status(e))
+        print(f"Error downloading logo from {logo_url}: {str(e)}")
+        return None
+
+class LogoDownloader:
+    """Bounded thread pool that fetches logos in the background.
+
+    `submit` returns a future resolving to the logo bytes (or None), so callers
+    can keep walking profiles while downloads are in flight and collect the
+    results afterwards in their original order. A URL is downloaded once per
+    downloader; later submits of it share the first future.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT, download=download_logo):
+        self.timeout = timeout
+        self._download = download
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="logo-download")
+        self._futures = {}
+
+    def submit(self, logo_url):
+        future = self._futures.get(logo_url)
+        if future is None:
+            future = self._futures[logo_url] = self._executor.submit(self._download, logo_url, self.timeout)
+        return future
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+from MarketMap_generation.logo_cache import LOGO_CACHE_DIR, _write_atomic
+
+FAILURE_DIR = os.path.join(LOGO_CACHE_DIR, "failures")  # failures/<sha256(url)>.json
+
+FAILURE_CACHE_ENABLED = os.getenv("MM_DEAD_LOGO_CACHE", "1").lower() not in ("0", "false", "no")
+# A URL that failed n times in a row is re-probed after base * 2**(n-1) seconds, capped at RETRY_MAX.
+# The base is RETRY_BASE for permanent failures and TRANSIENT_RETRY_BASE for the rest.
+RETRY_BASE = int(os.getenv("MM_DEAD_LOGO_RETRY", str(6 * 3600)))
+TRANSIENT_RETRY_BASE = int(os.getenv("MM_DEAD_LOGO_RETRY_TRANSIENT", str(3600)))
+RETRY_MAX = int(os.getenv("MM_DEAD_LOGO_RETRY_MAX", str(30 * 24 * 3600)))
+
+# Gone (404/410), a host name that does not resolve, or a refused connection: dead from the first failure.
+PERMANENT_FAILURES = {404, 410, "NameResolutionError", "ConnectionRefusedError"}
+# A hung host costs the full timeout (plus a retry) on every run, so timeouts are skipped from the
+# first failure too, but re-probed sooner (TRANSIENT_RETRY_BASE).
+TIMEOUT_FAILURES = {"ReadTimeout", "ConnectTimeout", "Timeout"}
+# Anything else (5xx, other errors) only counts as dead once it failed this many runs in a row.
+REPEATED_FAILURES = 2
+# Throttling says nothing about the URL; it is reported for the run but never recorded.
+UNCACHED_FAILURES = {429}
+
+# How each logo URL missed in this run: url -> (source, status), source "cached" or "live"
+_misses = {}
+_misses_lock = threading.Lock()
+
+def _failure_path(logo_url):
+    return os.path.join(FAILURE_DIR, f"{hashlib.sha256(logo_url.encode('utf-8')).hexdigest()}.json")
+
+def load_failure(logo_url):
+    """Return the stored failure record for a URL, or None."""
+    try:
+        with open(_failure_path(logo_url), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def next_probe_at(failure):
+    """When a URL with this failure record may be requested again."""
+    status, failures = failure["status"], failure["failures"]
+    if status in PERMANENT_FAILURES:
+        base = RETRY_BASE
+    elif status in TIMEOUT_FAILURES:
+        base = TRANSIENT_RETRY_BASE
+    else:
+        base = TRANSIENT_RETRY_BASE
+        failures -= REPEATED_FAILURES - 1
+        if failures < 1:
+            return failure["last_attempt"]  # failed once so far: try again on the next run
+    return failure["last_attempt"] + min(RETRY_MAX, base * 2 ** (failures - 1))
+
+def should_skip(logo_url):
+    """True when `logo_url` is known dead and not yet due for a re-probe."""
+    if not FAILURE_CACHE_ENABLED or not logo_url:
+        return False
+    failure = load_failure(logo_url)
+    if failure is None or time.time() >= next_probe_at(failure):
+        return False
+    with _misses_lock:
+        _misses[logo_url] = ("cached", failure["status"])
+    return True
+
+def error_status(error):
+    """Status recorded for a failed request: the DNS or refused-connection root cause, else the error's name."""
+    cause = error
+    for _ in range(8):  # requests -> urllib3 MaxRetryError -> NewConnectionError -> socket error
+        if isinstance(cause, socket.gaierror) or type(cause).__name__ == "NameResolutionError":
+            return "NameResolutionError"
+        if isinstance(cause, ConnectionRefusedError):
+            return "ConnectionRefusedError"
+        cause = getattr(cause, "reason", None) or cause.__cause__ or cause.__context__
+        if cause is None:
+            break
+    return type(error).__name__
+
+def record_failure(logo_url, status):
+    """Note a live failure: an HTTP status code or error_status(). Throttling is not cached."""
+    with _misses_lock:
+        _misses[logo_url] = ("live", status)
+    if not FAILURE_CACHE_ENABLED or status in UNCACHED_FAILURES:
+        return
+    now = time.time()
+    failure = load_failure(logo_url) or {"url": logo_url, "failures": 0, "first_failed_at": now}
+    failure.update(status=status, failures=failure["failures"] + 1, last_attempt=now)
+    try:
+        _write_atomic(_failure_path(logo_url), json.dumps(failure).encode("utf-8"))
+    except OSError as e:
+        print(f"Could not update logo failure cache for {logo_url}: {str(e)}")
+
+def record_success(logo_url):
+    """Forget an earlier failure of a URL that downloaded again."""
+    if FAILURE_CACHE_ENABLED:
+        try:
+            os.remove(_failure_path(logo_url))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Could not update logo failure cache for {logo_url}: {str(e)}")
+
+def is_cached_miss(logo_url):
+    with _misses_lock:
+        miss = _misses.get(logo_url)
+    return miss is not None and miss[0] == "cached"
+
+def miss_summary(records):
+    """Header line for the summaries: how many of `records` lack a logo, and why."""
+    missing = [record.logo_url for record in records if not record.logo_success]
+    cached = sum(1 for logo_url in missing if logo_url and is_cached_miss(logo_url))
+    no_url = sum(1 for logo_url in missing if not logo_url)
+    return f"{len(missing)} ({cached} known-dead URLs skipped, {len(missing) - cached - no_url} failed this run, {no_url} without a logo URL)"
+
+def miss_reason(logo_url):
+    """Why a profile has no logo, for the summaries: "no URL", "404", "cached: 404 since 2026-05-01", ..."""
+    if not logo_url:
+        return "no URL"
+    with _misses_lock:
+        miss = _misses.get(logo_url)
+    if miss is None:
+        return "failed"
+    source, status = miss
+    if source == "live":
+        return str(status)
+    failure = load_failure(logo_url)
+    if failure is None:
+        return f"cached: {status}"
+    since = datetime.fromtimestamp(failure["first_failed_at"]).strftime("%Y-%m-%d")
+    return f"cached: {status} since {since}"
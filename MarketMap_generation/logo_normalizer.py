@@ -0,0 +1,155 @@
+import hashlib
+import io
+import os
+import posixpath
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from MarketMap_generation.instrumentation import record
+from MarketMap_generation.logo_cache import LOGO_CACHE_DIR, _write_atomic
+
+try:
+    from PIL import Image
+except ImportError:  # normalization is skipped without Pillow
+    Image = None
+
+# MM_NORMALIZE_LOGOS=1 downscales raster logos larger than MM_LOGO_MAX_SIZE px (same path and
+# format) and adds a MM_LOGO_THUMB_SIZE px thumbnail per logo under THUMBNAIL_DIR in the archives.
+NORMALIZE_ENABLED = os.getenv("MM_NORMALIZE_LOGOS", "").lower() in ("1", "true", "yes")
+MAX_SIZE = int(os.getenv("MM_LOGO_MAX_SIZE", "512"))
+THUMB_SIZE = int(os.getenv("MM_LOGO_THUMB_SIZE", "128"))
+THUMB_FORMAT = os.getenv("MM_LOGO_THUMB_FORMAT", "png").lower()  # png or webp
+WORKERS = int(os.getenv("MM_NORMALIZE_WORKERS", "0")) or os.cpu_count() or 1
+
+THUMBNAIL_DIR = "_thumbnails"
+NORMALIZED_DIR = os.path.join(LOGO_CACHE_DIR, "normalized")  # normalized/<sha256>-<settings>.{main,thumb,none}
+
+# Extension -> Pillow format of the rasters that are re-encoded when too large.
+# SVGs are vectors and stay as they are (rasterizing them would need cairosvg);
+# GIFs may be animated, so only their thumbnail is made.
+RESIZABLE_FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG', '.webp': 'WEBP'}
+THUMBNAIL_EXTENSIONS = set(RESIZABLE_FORMATS) | {'.gif'}
+
+def _encode(image, image_format):
+    output = io.BytesIO()
+    if image_format == 'JPEG':
+        image.convert('RGB').save(output, format='JPEG', quality=90, optimize=True)
+    elif image_format == 'WEBP':
+        image.save(output, format='WEBP', quality=90, method=4)
+    else:
+        image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+def normalize_logo(content, extension, max_size=MAX_SIZE, thumb_size=THUMB_SIZE, thumb_format=THUMB_FORMAT):
+    """Return (resized, thumbnail) bytes for one logo; either is None when not applicable.
+
+    `resized` is only set when the logo exceeds `max_size` and re-encoding
+    it in its own format makes it smaller. Runs in the worker processes.
+    """
+    try:
+        image = Image.open(io.BytesIO(content))
+        image.load()
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA')
+
+        resized = None
+        if extension in RESIZABLE_FORMATS and max(image.size) > max_size:
+            bounded = image.copy()
+            bounded.thumbnail((max_size, max_size), Image.LANCZOS)
+            resized = _encode(bounded, RESIZABLE_FORMATS[extension])
+            if len(resized) >= len(content):
+                resized = None
+
+        thumbnail = image.copy()
+        thumbnail.thumbnail((thumb_size, thumb_size), Image.LANCZOS)
+        return resized, _encode(thumbnail, 'WEBP' if thumb_format == 'webp' else 'PNG')
+    except Exception:
+        # Not an image Pillow can read (or a broken one): the logo is kept as downloaded
+        return None, None
+
+def _cache_key(content):
+    return f"{hashlib.sha256(content).hexdigest()}-{MAX_SIZE}-{THUMB_SIZE}-{THUMB_FORMAT}"
+
+def _load_cached(key):
+    """(resized, thumbnail) from the cache, (None, None) for a known non-image, or False if absent."""
+    base = os.path.join(NORMALIZED_DIR, key)
+    if os.path.exists(f"{base}.none"):
+        return None, None
+    try:
+        with open(f"{base}.thumb", "rb") as f:
+            thumbnail = f.read()
+    except OSError:
+        return False
+    try:
+        with open(f"{base}.main", "rb") as f:
+            return f.read(), thumbnail
+    except OSError:
+        return None, thumbnail
+
+def _store_cached(key, resized, thumbnail):
+    base = os.path.join(NORMALIZED_DIR, key)
+    try:
+        if thumbnail is None:
+            _write_atomic(f"{base}.none", b"")
+            return
+        if resized is not None:
+            _write_atomic(f"{base}.main", resized)
+        _write_atomic(f"{base}.thumb", thumbnail)
+    except OSError as e:
+        print(f"Could not update normalized logo cache: {str(e)}")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    # One pool per process, shared by every archive written in it (the pipeline writes from its own thread)
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS)
+        return _pool
+
+def thumbnail_path(path):
+    return posixpath.join(THUMBNAIL_DIR, f"{posixpath.splitext(path)[0]}.{THUMB_FORMAT}")
+
+def normalize_logos(logos, enabled=NORMALIZE_ENABLED):
+    """Yield the (path, content) archive entries for a `logos` dict.
+
+    Disabled (or without Pillow) this is just logos.items(). Enabled, each
+    oversized raster is replaced by its bounded version and a thumbnail
+    entry follows each logo. Results are cached by content hash; the rest
+    are computed across cores on a process pool.
+    """
+    if not enabled or not logos:
+        yield from logos.items()
+        return
+    if Image is None:
+        print("MM_NORMALIZE_LOGOS is set but Pillow is not installed; logos are written unchanged.")
+        yield from logos.items()
+        return
+
+    started = time.perf_counter()
+    items = list(logos.items())
+    extensions = [posixpath.splitext(path)[1].lower() for path, _ in items]
+    keys = [_cache_key(content) if extension in THUMBNAIL_EXTENSIONS else None
+            for (_, content), extension in zip(items, extensions)]
+    results = [_load_cached(key) if key else (None, None) for key in keys]
+
+    missing = [index for index, result in enumerate(results) if result is False]
+    if missing:
+        computed = _get_pool().map(
+            normalize_logo,
+            [items[index][1] for index in missing],
+            [extensions[index] for index in missing],
+            chunksize=max(1, len(missing) // (WORKERS * 4)),
+        )
+        for index, (resized, thumbnail) in zip(missing, computed):
+            _store_cached(keys[index], resized, thumbnail)
+            results[index] = (resized, thumbnail)
+    record("normalize", seconds=time.perf_counter() - started, nbytes=sum(len(content) for _, content in items))
+
+    for (path, content), (resized, thumbnail) in zip(items, results):
+        yield path, resized if resized is not None else content
+        if thumbnail is not None:
+            yield thumbnail_path(path), thumbnail
@@ -0,0 +1,309 @@
+import json
+import os
+import sys
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from MarketMap_generation import data_processor, data_processor_AI, helpers, helpers_AI
+from MarketMap_generation.archive_writer import open_archive
+from MarketMap_generation.checkpoint import Checkpoint
+from MarketMap_generation.graphql_cache import cached_post
+from MarketMap_generation.instrumentation import timed
+from MarketMap_generation.logo_downloader import LogoDownloader, download_logo, DEFAULT_MAX_WORKERS, DEFAULT_TIMEOUT
+from MarketMap_generation.logo_normalizer import normalize_logos
+from MarketMap_generation.market_map_specs import SPECS
+from MarketMap_generation.mtndao import data_processor_mtndao, helpers_mtndao
+
+url = "https://beta.node.thegrid.id/graphql"
+
+# Profiles selected by the specs are fetched once, by ID, in chunks on a few threads
+ID_CHUNK_SIZE = 200
+ID_LOOKUP_WORKERS = 4
+
+# Per spec: the IDs it selects and, with products_where, which of their products it keeps
+SELECTION_QUERY = """
+query MarketMapSelection {{
+  profileInfos(where: {where}) {{
+    id{products}
+  }}
+}}
+"""
+SELECTION_PRODUCTS = """
+    root {{
+      products(where: {products_where}) {{
+        id
+      }}
+    }}"""
+
+# Everything any spec reads; products are unfiltered and narrowed per spec afterwards
+PROFILE_QUERY = """
+query MarketMapProfiles($profileIds: [String1!]) {
+  profileInfos(where: {id: {_in: $profileIds}}) {
+    id
+    name
+    logo
+    tagLine
+    descriptionShort
+    profileStatus {
+      name
+    }
+    profileSector {
+      name
+    }
+    root {
+      products {
+        id
+        name
+        isMainProduct
+        productType {
+          id
+          name
+        }
+      }
+      assets {
+        id
+        name
+        assetType {
+          name
+        }
+      }
+      socials(where: {socialType: {name: {_eq: "Twitter / X"}}}) {
+        name
+        urls {
+          url
+        }
+      }
+    }
+  }
+}
+"""
+
+def parse_main_product_only(profile):
+
+    # Asset-management rule: the main product's type or N/A, no fallback to other products or assets
+    entry = data_processor.parse_profile(profile)
+    products = profile.get('root', {}).get('products') or []
+    main_product = next((product for product in products if product.get('isMainProduct')), None)
+    entry.product_type = main_product.get('productType', {}).get('name', 'N/A') if main_product else "N/A"
+    entry.has_main_product = bool(products)
+    return entry
+
+# classification -> profile parser; they differ only in how the product type is chosen
+CLASSIFICATION_RULES = {
+    'main_product': data_processor.parse_profile,                # main product, else first product, else ASSETS
+    'first_product_or_asset': data_processor_AI.parse_profile,   # first product, else first asset type
+    'main_product_only': parse_main_product_only,
+    'sector_only': data_processor_mtndao.parse_profile,          # no product type
+}
+
+# report -> summary writer
+REPORTS = {
+    'folders': helpers.results_writer,
+    'sector_distribution': helpers_AI.results_writer,
+    'sectors': helpers_mtndao.results_writer,
+}
+
+LAYOUTS = ('sector/product_type', 'sector')
+
+def validate_spec(name, spec):
+
+    for key in ('where', 'classification', 'layout', 'report', 'output'):
+        if key not in spec:
+            raise ValueError(f"Spec '{name}' has no '{key}'")
+    if spec['classification'] not in CLASSIFICATION_RULES:
+        raise ValueError(f"Spec '{name}': unknown classification '{spec['classification']}'")
+    if spec['layout'] not in LAYOUTS:
+        raise ValueError(f"Spec '{name}': unknown layout '{spec['layout']}'")
+    if spec['report'] not in REPORTS:
+        raise ValueError(f"Spec '{name}': unknown report '{spec['report']}'")
+    if spec['layout'] == 'sector' and spec['classification'] != 'sector_only':
+        raise ValueError(f"Spec '{name}': the 'sector' layout needs the 'sector_only' classification")
+
+def fetch_profile_infos(url, query, variables=None):
+
+    response = cached_post(url, query, variables)
+    if response.status_code == 200:
+        try:
+            data = response.json()
+            if "data" in data and "profileInfos" in data["data"]:
+                return data["data"]["profileInfos"]
+            else:
+                print("Unexpected response structure:", data)
+                raise Exception("Missing 'profileInfos' in response")
+        except json.JSONDecodeError as e:
+            print(f"Error decoding JSON: {str(e)}")
+            print(f"Response content: {response.text}")
+            raise
+    else:
+        print(f"Query failed with status code {response.status_code}")
+        print(f"Response content: {response.text}")
+        raise Exception(f"Query failed with status code: {response.status_code}")
+
+def fetch_selection(url, spec):
+    """[profile_id, product_ids or None] for every profile the spec selects, in query order."""
+    products = SELECTION_PRODUCTS.format(products_where=spec['products_where']) if spec.get('products_where') else ""
+    query = SELECTION_QUERY.format(where=spec['where'].strip(), products=products)
+    selection = []
+    for profile in fetch_profile_infos(url, query):
+        product_ids = None
+        if products:
+            product_ids = [str(product['id']) for product in (profile.get('root') or {}).get('products') or []]
+        selection.append([str(profile['id']), product_ids])
+    return selection
+
+@timed("fetch")
+def fetch_profiles(url, specs, checkpoint, chunk_size=ID_CHUNK_SIZE, max_workers=ID_LOOKUP_WORKERS):
+    """Selections per spec and the union of their profiles, each fetched once: ({name: selection}, {id: profile})."""
+    selections = {
+        name: checkpoint.step(f"selection:{name}:{spec['where']}:{spec.get('products_where')}", lambda spec=spec: fetch_selection(url, spec))
+        for name, spec in specs.items()
+    }
+    profile_ids = list(dict.fromkeys(profile_id for selection in selections.values() for profile_id, _ in selection))
+    selected = sum(len(selection) for selection in selections.values())
+    print(f"{len(specs)} specs select {selected} profiles, {len(profile_ids)} of them distinct")
+
+    chunks = [profile_ids[i:i + chunk_size] for i in range(0, len(profile_ids), chunk_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = executor.map(
+            lambda chunk: checkpoint.step("profileIds:" + ",".join(chunk), lambda: fetch_profile_infos(url, PROFILE_QUERY, {"profileIds": chunk})),
+            chunks,
+        )
+        profiles_by_id = {str(profile['id']): profile for page in pages for profile in page}
+    return selections, profiles_by_id
+
+def restrict_products(profile, product_ids):
+    """The profile as the spec's query would have returned it: only the products it kept."""
+    if product_ids is None:
+        return profile
+    kept = set(product_ids)
+    root = dict(profile.get('root') or {})
+    root['products'] = [product for product in root.get('products') or [] if str(product.get('id')) in kept]
+    return dict(profile, root=root)
+
+def classify(spec, selection, profiles_by_id, downloader):
+    """Build one spec's tree, logos, results and CSV rows; logos come from the shared downloader."""
+    parse = CLASSIFICATION_RULES[spec['classification']]
+    logos = {}
+    results = []
+    csv_data = []
+    skipped_items = []
+    sector_counts = defaultdict(int)
+    if spec['layout'] == 'sector':
+        tree = defaultdict(list)  # sector -> profiles
+        sector_index = None
+        add = lambda entry, logo_content: data_processor_mtndao.add_profile(entry, logo_content, tree, logos, results, csv_data, sector_counts)
+    else:
+        tree = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))  # sector -> product_type -> profiles
+        sector_index = defaultdict(lambda: {'rows': [], 'results': [], 'logos': {}})
+        add = lambda entry, logo_content: data_processor.add_profile(entry, logo_content, tree, logos, results, csv_data, sector_counts, sector_index)
+
+    for profile_id, product_ids in selection:
+        profile = profiles_by_id.get(profile_id)
+        try:
+            if profile is None:
+                raise Exception("Not returned by the profile lookup")
+            entry = parse(restrict_products(profile, product_ids))
+            add(entry, downloader.submit(entry.logo_url).result() if entry.logo_url else None)
+        except Exception as e:
+            skipped_items.append({
+                'id': profile_id,
+                'name': (profile or {}).get('name', 'Unknown Name'),
+                'reason': str(e)
+            })
+
+    return tree, skipped_items, logos, results, csv_data, sector_counts, sector_index
+
+def write_archive(spec, version, archive_name, logos, results_content, csv_content):
+
+    output = spec['output']
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    zip_filename = f"{archive_name}_v{version}_{current_time}.zip"
+    zip_path = os.path.join(output['directory'], f"v{version}", zip_filename)
+
+    with open_archive(zip_path) as zip_file:
+        for filepath, content in normalize_logos(logos):
+            zip_file.writelogo(filepath, content)
+
+        zip_file.writetext(f"{output['prefix']}_results_v{version}_{current_time}.txt", results_content)
+        zip_file.writestr(f"{output['prefix']}_folder_contents_v{version}_{current_time}.csv", csv_content)
+
+    print(f"ZIP file created at: {zip_path}")
+    return zip_filename
+
+def export_spec(spec, version, generation_mode, tree, skipped_items, logos, results, csv_data, sector_counts, sector_index):
+    """Write the spec's general archive and, in 'all' mode, one archive per sector."""
+    layout_helpers = helpers_mtndao if spec['layout'] == 'sector' else helpers
+    results_writer = REPORTS[spec['report']]
+
+    results_content = results_writer(tree, results, skipped_items, len(logos), sector_counts)
+    zip_filenames = [write_archive(spec, version, spec['output']['archive'], logos, results_content, layout_helpers.generate_csv_content(csv_data))]
+
+    if generation_mode == "all":
+        for specific_sector in sector_counts:
+            if sector_index is not None:
+                filtered = helpers.filter_by_sector(tree, csv_data, logos, results, specific_sector, sector_index)
+            else:
+                filtered = helpers_mtndao.filter_by_sector(tree, csv_data, logos, results, specific_sector)
+            filtered_tree, filtered_data, filtered_logos, filtered_results = filtered
+            results_content = results_writer(filtered_tree, filtered_results, skipped_items, len(filtered_logos), {specific_sector: len(filtered_results)})
+            archive_name = spec['output']['sector_archive'].format(sector=specific_sector)
+            zip_filenames.append(write_archive(spec, version, archive_name, filtered_logos, results_content, layout_helpers.generate_csv_content(filtered_data)))
+    return zip_filenames
+
+def run_specs(specs, version, generation_mode="general", url=url, checkpoint=None, download=download_logo,
+              max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+    """Run several specs on one fetch and one logo pass; returns {spec name: archive filenames}.
+
+    Profiles selected by more than one spec are fetched once, and every logo
+    URL is downloaded once for all of them.
+    """
+    for name, spec in specs.items():
+        validate_spec(name, spec)
+    checkpoint = checkpoint or Checkpoint(f"specs_{'_'.join(specs)}_v{version}", enabled=False)
+
+    selections, profiles_by_id = fetch_profiles(url, specs, checkpoint)
+    archives = {}
+    with LogoDownloader(max_workers=max_workers, timeout=timeout, download=checkpoint.wrap_download(download)) as downloader:
+        # Queue every distinct logo up front so the downloads overlap the classification below
+        for profile in profiles_by_id.values():
+            if profile.get('logo'):
+                downloader.submit(profile['logo'])
+
+        for name, spec in specs.items():
+            processed = classify(spec, selections[name], profiles_by_id, downloader)
+            archives[name] = export_spec(spec, version, generation_mode, *processed)
+    return archives
+
+def main():
+
+    version = input("Please enter the version: ").strip()
+    names = input(f"Specs to run, comma-separated ({', '.join(SPECS)}; empty for all): ").strip()
+    generation_mode = input("Choose generation mode ('General' or 'All'): ").strip().lower()
+
+    try:
+        names = [name.strip() for name in names.split(",") if name.strip()] or list(SPECS)
+        unknown = [name for name in names if name not in SPECS]
+        if unknown:
+            print(f"Unknown specs: {', '.join(unknown)}")
+            return
+        if generation_mode not in ("general", "all"):
+            print("Invalid generation mode. Please choose 'General' or 'All'.")
+            return
+
+        # Fetched profiles and downloaded logos are kept until every archive exists, so a rerun resumes
+        checkpoint = Checkpoint(f"specs_{'_'.join(names)}_v{version}")
+        archives = run_specs({name: SPECS[name] for name in names}, version, generation_mode, checkpoint=checkpoint)
+        checkpoint.finish()
+        for name, zip_filenames in archives.items():
+            print(f"{name}: {len(zip_filenames)} archive(s), e.g. {zip_filenames[0]}")
+        print("Export completed successfully.")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Market map specs run by market_map_engine.py. Each spec is data only:
+#   where           profileInfos filter (GraphQL)
+#   products_where  optional filter on root.products; other products are left out before classifying
+#   classification  product-type rule, see market_map_engine.CLASSIFICATION_RULES
+#   layout          logo folders: "sector/product_type" or "sector"
+#   report          summary format, see market_map_engine.REPORTS
+#   output          output directory (relative to the working directory, like the generators),
+#                   archive names and the prefix of the results/CSV entries
+
+SOLANA_WHERE = """
+{
+  _and: [
+    {
+      _or: [
+        {
+          root: {
+            assets: {
+              assetDeployments: {
+                smartContractDeployment: {
+                  deployedOnProduct: {
+                    id: {_eq: "22"}
+                  }
+                }
+              }
+            }
+          }
+        },
+        {
+          root: {
+            products: {
+              _or: [
+                {
+                  productDeployments: {
+                    smartContractDeployment: {
+                      deployedOnProduct: {
+                        id: {_eq: "22"}
+                      }
+                    }
+                  }
+                },
+                {
+                  supportsProducts: {
+                    supportsProduct: {
+                      id: {_eq: "22"}
+                    }
+                  }
+                }
+              ]
+            }
+          }
+        }
+      ]
+    },
+    {
+      profileStatusId: {_in: [1, 2, 30]}
+    }
+  ]
+}
+"""
+
+ASSET_MANAGEMENT_PRODUCT_TYPES = "[692, 472, 20, 49, 48]"
+
+SPECS = {
+    'tgs7': {
+        'where': SOLANA_WHERE,
+        'products_where': None,
+        'classification': 'main_product',
+        'layout': 'sector/product_type',
+        'report': 'folders',
+        'output': {
+            'directory': '../Outputs',
+            'archive': 'mm_solana_grid_data',
+            'sector_archive': 'mm_solana_sector_{sector}_data',
+            'prefix': 'solana',
+        },
+    },
+    'ai': {
+        'where': """
+{
+  _and: [
+    {profileStatusId: {_in: [1, 2, 30]}},
+    {root: {profileTags: {tag: {name: {_eq: "AI"}}}}},
+    {root: {profileTags: {tag: {name: {_eq: "Solana"}}}}}
+  ]
+}
+""",
+        'products_where': "{isMainProduct: {_eq: true}}",
+        'classification': 'first_product_or_asset',
+        'layout': 'sector/product_type',
+        'report': 'sector_distribution',
+        'output': {
+            'directory': '../Outputs',
+            'archive': 'mm_ai_grid_data',
+            'sector_archive': 'mm_ai_sector_{sector}_data',
+            'prefix': 'ai',
+        },
+    },
+    'mtndao': {
+        'where': """{root: {profileTags: {tag: {name: {_contains: "mtndao"}}}}}""",
+        'products_where': None,
+        'classification': 'sector_only',
+        'layout': 'sector',
+        'report': 'sectors',
+        'output': {
+            'directory': 'mtndao/Outputs',
+            'archive': 'mm_mtndao_grid_data',
+            'sector_archive': 'mm_mtndao_sector_{sector}_data',
+            'prefix': 'mtndao',
+        },
+    },
+    'asset_management': {
+        'where': f"""
+{{
+  _and: [
+    {SOLANA_WHERE},
+    {{root: {{products: {{productType: {{id: {{_in: {ASSET_MANAGEMENT_PRODUCT_TYPES}}}}}}}}}}}
+  ]
+}}
+""",
+        'products_where': f"{{productType: {{id: {{_in: {ASSET_MANAGEMENT_PRODUCT_TYPES}}}}}}}",
+        'classification': 'main_product_only',
+        'layout': 'sector/product_type',
+        'report': 'folders',
+        'output': {
+            'directory': '../Tools/get_AssetManagement_ProductTypes/output',
+            'archive': 'mm_asset_management_grid_data',
+            'sector_archive': 'mm_asset_management_sector_{sector}_data',
+            'prefix': 'asset_management',
+        },
+    },
+}
@@ -1,12 +1,25 @@
-import requests
 import json
+import os
 import traceback
 
-from MarketMap_generation.mtndao.data_processor_mtndao import process_data
-from MarketMap_generation.mtndao.helpers_mtndao import generate_results_content, generate_csv_content, create_zip_file
+from MarketMap_generation.checkpoint import Checkpoint
+from MarketMap_generation.graphql_cache import cached_post
+from MarketMap_generation.instrumentation import timed
+from MarketMap_generation.paginated_fetch import iter_profile_pages
+from MarketMap_generation.streaming_json import iter_streamed_pages
+from MarketMap_generation.logo_downloader import download_logo
+from MarketMap_generation.mtndao.data_processor_mtndao import process_data, process_data_to_archive
+from MarketMap_generation.mtndao.helpers_mtndao import results_writer, generate_csv_content, create_zip_file, create_streamed_zip_file
 
 url = "https://beta.node.thegrid.id/graphql"
 
+# Set MM_PAGE_SIZE to fetch profileInfos in pages and start processing on the first page.
+page_size = int(os.getenv("MM_PAGE_SIZE", "0"))
+# Set MM_STREAM_JSON=1 to decode the single profileInfos response profile by profile as it downloads.
+stream_json = os.getenv("MM_STREAM_JSON", "").lower() in ("1", "true", "yes")
+# Set MM_PIPELINE=1 to overlap fetching, logo downloads and archive writes (General mode).
+pipeline_mode = os.getenv("MM_PIPELINE", "").lower() in ("1", "true", "yes")
+
 query = """
 query GetLogosForMM {
   profileInfos(where: {root: {profileTags: {tag: {name: {_contains: "mtndao"}}}}}) {
@@ -42,9 +55,10 @@ query GetLogosForMM {
 }
 """
 
+@timed("fetch")
 def fetch_data(url, query):
 
-    response = requests.post(url, json={'query': query})
+    response = cached_post(url, query)
     print(f"HTTP Status Code: {response.status_code}")
     #print("Raw Response Content:", response.text[:500])
 
@@ -66,17 +80,40 @@ def fetch_data(url, query):
         raise Exception(f"Query failed with status code: {response.status_code}")
 
 
+def export_pipelined(data, version, download=download_logo):
+
+    # Logos stream from the download stage straight into the archive
+    def write_logos(zip_file):
+        tree, skipped_items, logos, results, csv_data, sector_counts = process_data_to_archive(data, zip_file, download=download)
+        results_content = results_writer(tree, results, skipped_items, len(logos), sector_counts)
+        return results_content, generate_csv_content(csv_data)
+
+    return create_streamed_zip_file(write_logos, version)
+
 def main():
     version = input("Please enter the version: ").strip()
 
     try:
-        data = fetch_data(url, query)
-        tree, skipped_items, logos, results, csv_data, sector_counts = process_data(data)
+        # Fetched profiles and downloaded logos are kept until the archive exists, so a rerun resumes
+        checkpoint = Checkpoint(f"mtndao_v{version}")
+        if page_size > 0:
+            data = checkpoint.pages(lambda offset: iter_profile_pages(url, query, page_size=page_size, start_offset=offset), resumable=True)
+        elif stream_json:
+            data = checkpoint.pages(lambda offset: iter_streamed_pages(url, query))
+        else:
+            data = checkpoint.response(lambda: fetch_data(url, query))
+        download = checkpoint.wrap_download(download_logo)
+
+        if pipeline_mode:
+            zip_filename = export_pipelined(data, version, download)
+        else:
+            tree, skipped_items, logos, results, csv_data, sector_counts = process_data(data, download=download)
 
-        results_content = generate_results_content(tree, results, skipped_items, len(logos), sector_counts)
-        csv_content = generate_csv_content(csv_data)
-        zip_filename = create_zip_file(logos, results_content, csv_content, version)
+            results_content = results_writer(tree, results, skipped_items, len(logos), sector_counts)
+            csv_content = generate_csv_content(csv_data)
+            zip_filename = create_zip_file(logos, results_content, csv_content, version)
 
+        checkpoint.finish()
         print(f"Export completed successfully. Zip file created: {zip_filename}")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
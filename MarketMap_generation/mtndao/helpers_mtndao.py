@@ -1,73 +1,78 @@
 import csv
 import os
-import zipfile
 from datetime import datetime
 import io
 
+from MarketMap_generation.archive_writer import open_archive
+from MarketMap_generation.logo_failures import miss_reason, miss_summary
+from MarketMap_generation.logo_normalizer import normalize_logos
+
 def generate_csv_content(csv_data):
     output = io.StringIO()
     fieldnames = ['name', 'gridid', 'tagLine', 'descriptionShort', 'sector', 'status_name', 'logo_url', 'Twitter handle', 'Twitter URL']
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    writer.writeheader()
-    for row in csv_data:
-        writer.writerow(row)
+    writer = csv.writer(output)
+    writer.writerow(fieldnames)
+    for record in csv_data:
+        writer.writerow(record.row(fieldnames))
     return output.getvalue()
 
-def generate_results_content(tree, results, skipped, logo_count, sector_counts):
+def write_results_content(stream, tree, results, skipped, logo_count, sector_counts):
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     total_profiles = len(results)
     skipped_count = len(skipped)
 
-    content = f"""
+    stream.write(f"""
 GRID DATA EXPORT SUMMARY
 ========================
 Date and Time: {current_time}
 Total Profiles Processed: {total_profiles}
 Total Logos: {logo_count}
+Missing Logos: {miss_summary(results)}
 Skipped Profiles: {skipped_count}
 
 Folder Structure:
-"""
+""")
     for sector, profiles in tree.items():
-        content += f"{sector}/ ({len(profiles)} profiles)\n"
+        stream.write(f"{sector}/ ({len(profiles)} profiles)\n")
 
-    content += "\nProcessed Profiles:\n"
-    content += "Name                 ID        Status       Sector                         Logo\n"
-    content += "-" * 75 + "\n"
-    for result in results:
-        name, id_, status_name, sector, logo_success = result
-        content += f"{name:<20} {id_:<9} {status_name:<12} {sector:<30} {'✓' if logo_success else '✗'}\n"
+    stream.write("\nProcessed Profiles:\n")
+    stream.write("Name                 ID        Status       Sector                         Logo\n")
+    stream.write("-" * 75 + "\n")
+    for record in results:
+        stream.write(f"{record.name:<20} {record.id:<9} {record.status:<12} {record.sector:<30} {'✓' if record.logo_success else '✗ ' + miss_reason(record.logo_url)}\n")
 
-    content += "\nSkipped Profiles:\n"
+    stream.write("\nSkipped Profiles:\n")
     for item in skipped:
-        content += f"- ID: {item['id']}, Name: {item['name']}, Reason: {item['reason']}\n"
+        stream.write(f"- ID: {item['id']}, Name: {item['name']}, Reason: {item['reason']}\n")
+
+def generate_results_content(tree, results, skipped, logo_count, sector_counts):
+    output = io.StringIO()
+    write_results_content(output, tree, results, skipped, logo_count, sector_counts)
+    return output.getvalue()
 
-    return content
+def results_writer(tree, results, skipped, logo_count, sector_counts):
+    # Deferred summary for the create_* functions: rendered straight into the archive entry
+    return lambda stream: write_results_content(stream, tree, results, skipped, logo_count, sector_counts)
 
 def filter_by_sector(tree, csv_data, logos, results, specific_sector):
     filtered_tree = {specific_sector: tree.get(specific_sector, [])}
-    filtered_data = [row for row in csv_data if row['sector'] == specific_sector]
+    filtered_data = [record for record in csv_data if record.sector == specific_sector]
     filtered_logos = {path: content for path, content in logos.items() if path.startswith(f"{specific_sector}/")}
-    filtered_results = [result for result in results if result[3] == specific_sector]
+    filtered_results = [record for record in results if record.sector == specific_sector]
     return filtered_tree, filtered_data, filtered_logos, filtered_results
 
 def create_sector_based_output(logos, results_content, csv_content, tree, version, specific_sector):
     current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
     zip_filename = f'mm_solana_sector_{specific_sector}_data_v{version}_{current_time}.zip'
-    zip_buffer = io.BytesIO()
+    zip_path = os.path.join(f'../mtndao/Outputs/v{version}', zip_filename)
 
-    with zipfile.ZipFile(zip_buffer, 'a', zipfile.ZIP_DEFLATED, False) as zip_file:
-        zip_file.writestr(f'mtndao_results_v{version}_{current_time}.txt', results_content)
+    with open_archive(zip_path) as zip_file:
+        zip_file.writetext(f'mtndao_results_v{version}_{current_time}.txt', results_content)
         zip_file.writestr(f'mtndao_folder_contents_v{version}_{current_time}.csv', csv_content)
 
-        for filepath, content in logos.items():
+        for filepath, content in normalize_logos(logos):
             if filepath.startswith(f"{specific_sector}/"):
-                zip_file.writestr(filepath, content)
-
-    os.makedirs(f'../mtndao/Outputs/v{version}', exist_ok=True)
-    zip_path = os.path.join(f'../mtndao/Outputs/v{version}', zip_filename)
-    with open(zip_path, 'wb') as f:
-        f.write(zip_buffer.getvalue())
+                zip_file.writelogo(filepath, content)
 
     print(f"Sector-based ZIP file created at: {zip_path}")
     return zip_filename
@@ -75,20 +80,31 @@ def create_sector_based_output(logos, results_content, csv_content, tree, versio
 def create_zip_file(logos, results_content, csv_content, version):
     current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
     zip_filename = f'mm_mtndao_grid_data_v{version}_{current_time}.zip'
-    zip_buffer = io.BytesIO()
+    zip_path = os.path.join(f'../mtndao/Outputs/v{version}', zip_filename)
 
-    with zipfile.ZipFile(zip_buffer, 'a', zipfile.ZIP_DEFLATED, False) as zip_file:
+    with open_archive(zip_path) as zip_file:
         # Add logos maintaining sector folder structure
-        for filepath, content in logos.items():
-            zip_file.writestr(filepath, content)
+        for filepath, content in normalize_logos(logos):
+            zip_file.writelogo(filepath, content)
 
-        zip_file.writestr(f'mtndao_results_v{version}_{current_time}.txt', results_content)
+        zip_file.writetext(f'mtndao_results_v{version}_{current_time}.txt', results_content)
         zip_file.writestr(f'mtndao_folder_contents_v{version}_{current_time}.csv', csv_content)
 
-    os.makedirs(f'../mtndao/Outputs/v{version}', exist_ok=True)
+    print(f"ZIP file created at: {zip_path}")
+    return zip_filename
+
+def create_streamed_zip_file(write_logos, version):
+    # Same archive as create_zip_file, but write_logos(zip_file) adds the logos itself
+    # (e.g. process_data_to_archive) and returns (results_content, csv_content) afterwards.
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    zip_filename = f'mm_mtndao_grid_data_v{version}_{current_time}.zip'
     zip_path = os.path.join(f'../mtndao/Outputs/v{version}', zip_filename)
-    with open(zip_path, 'wb') as f:
-        f.write(zip_buffer.getvalue())
+
+    with open_archive(zip_path) as zip_file:
+        results_content, csv_content = write_logos(zip_file)
+
+        zip_file.writetext(f'mtndao_results_v{version}_{current_time}.txt', results_content)
+        zip_file.writestr(f'mtndao_folder_contents_v{version}_{current_time}.csv', csv_content)
 
     print(f"ZIP file created at: {zip_path}")
-    return zip_filename
\ No newline at end of file
+    return zip_filename
@@ -0,0 +1,101 @@
+import itertools
+import json
+import queue
+import re
+import threading
+
+from MarketMap_generation.graphql_cache import cached_post
+
+DEFAULT_PAGE_SIZE = 250
+DEFAULT_PREFETCH = 2  # pages fetched ahead of the consumer
+PAGE_ORDER_BY = "{id: Asc}"  # stable order so offsets don't skip or repeat profiles
+
+_DONE = object()
+
+def paginate_query(query, limit, offset, order_by=PAGE_ORDER_BY):
+    """Add limit/offset (and a stable order) to the profileInfos arguments of `query`."""
+    page_args = f"limit: {limit}, offset: {offset}"
+    if order_by:
+        page_args += f", order_by: {order_by}"
+
+    if re.search(r"profileInfos\s*\(", query):
+        return re.sub(r"profileInfos\s*\(", f"profileInfos({page_args}, ", query, count=1)
+    return re.sub(r"profileInfos\s*\{", f"profileInfos({page_args}) {{", query, count=1)
+
+def fetch_page(url, query, limit, offset):
+
+    response = cached_post(url, paginate_query(query, limit, offset))
+
+    if response.status_code == 200:
+        try:
+            data = response.json()
+            if "data" in data and "profileInfos" in data["data"]:
+                return data["data"]["profileInfos"]
+            else:
+                print("Unexpected response structure:", data)
+                raise Exception("Missing 'profileInfos' in response")
+        except json.JSONDecodeError as e:
+            print(f"Error decoding JSON: {str(e)}")
+            print(f"Response content: {response.text}")
+            raise
+    else:
+        print(f"Page query (offset {offset}) failed with status code {response.status_code}")
+        print(f"Response content: {response.text}")
+        raise Exception(f"Query failed with status code: {response.status_code}")
+
+def iter_profile_pages(url, query, page_size=DEFAULT_PAGE_SIZE, prefetch=DEFAULT_PREFETCH, start_offset=0):
+    """Yield lists of profileInfos page by page.
+
+    A background thread keeps up to `prefetch` pages in flight, so the caller can
+    process page N while page N+1 is still downloading. Fetch errors are re-raised
+    in the caller. `start_offset` resumes an earlier fetch at that profile.
+    """
+    pages = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def producer():
+        offset = start_offset
+        try:
+            while not stop.is_set():
+                page = fetch_page(url, query, page_size, offset)
+                print(f"Fetched page at offset {offset}: {len(page)} profiles")
+                if page:
+                    pages.put(page)
+                if len(page) < page_size:
+                    break
+                offset += page_size
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(_DONE)
+
+    worker = threading.Thread(target=producer, name="profile-pages", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Unblock the producer if it is waiting on a full queue.
+        while worker.is_alive():
+            try:
+                pages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+def iter_pages(data):
+    """Iterate pages of profiles from a full GraphQL response or from an iterable of pages."""
+    if isinstance(data, dict):
+        return iter([data['data']['profileInfos']])
+    return iter(data)
+
+def iter_profiles(data):
+    """Iterate profiles from a full GraphQL response or from an iterable of pages."""
+    if isinstance(data, dict):
+        return iter(data['data']['profileInfos'])
+    return itertools.chain.from_iterable(data)
@@ -0,0 +1,131 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from MarketMap_generation.logo_downloader import download_logo, DEFAULT_MAX_WORKERS, DEFAULT_TIMEOUT
+
+DEFAULT_QUEUE_SIZE = 64  # profiles in flight between the fetch, download and archive stages
+
+class ArchiveLogoSink:
+    """Stands in for the `logos` dict of process_data.
+
+    Each logo assigned to it is written straight into `zip_file` (when given)
+    and only its path and size are kept, so logo bytes do not accumulate.
+    """
+
+    def __init__(self, zip_file=None):
+        self.zip_file = zip_file
+        self.sizes = {}
+
+    def __setitem__(self, path, content):
+        if self.zip_file is not None:
+            self.zip_file.writelogo(path, content)
+        self.sizes[path] = len(content)
+
+    def __contains__(self, path):
+        return path in self.sizes
+
+    def __iter__(self):
+        return iter(self.sizes)
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def keys(self):
+        return self.sizes.keys()
+
+def run_pipeline(pages, parse_profile, add_profile, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT, queue_size=DEFAULT_QUEUE_SIZE, download=download_logo):
+    """Run fetch -> parse -> download -> add_profile as overlapping asyncio stages.
+
+    `pages` yields lists of profiles (it may block, e.g. iter_profile_pages).
+    `parse_profile(profile)` returns an entry with a 'logo_url', and
+    `add_profile(entry, logo_content)` consumes it; logos are fetched with
+    `download(logo_url, timeout)`. add_profile is called in
+    profile order from a single thread, so it may write to an open archive.
+    At most `queue_size` profiles are in flight at once. Returns the skipped
+    items in the same shape as process_data.
+    """
+    return asyncio.run(_run_pipeline(pages, parse_profile, add_profile, max_workers, timeout, queue_size, download))
+
+async def _run_pipeline(pages, parse_profile, add_profile, max_workers, timeout, queue_size, download):
+    loop = asyncio.get_running_loop()
+    io_executor = ThreadPoolExecutor(max_workers=max_workers + 1, thread_name_prefix="pipeline-io")
+    archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-archive")
+
+    # archive_queue keeps profile order; each item carries a future that its download resolves.
+    archive_queue = asyncio.Queue(maxsize=queue_size)
+    download_queue = asyncio.Queue(maxsize=queue_size)
+    skipped_items = []
+    # Profiles sharing a logo URL while it is still queued share its download. The entry
+    # is dropped once assembled so logo bytes are not kept for the whole run.
+    pending_logos = {}
+
+    async def produce():
+        page_iterator = iter(pages)
+        while True:
+            page = await loop.run_in_executor(io_executor, next, page_iterator, None)
+            if page is None:
+                break
+            for profile in page:
+                try:
+                    entry, error = parse_profile(profile), None
+                except Exception as e:
+                    entry, error = None, e
+                logo_url = entry['logo_url'] if error is None else None
+                logo_future = pending_logos.get(logo_url)
+                if logo_future is not None:
+                    await archive_queue.put((profile, entry, error, logo_future))
+                    continue
+                logo_future = loop.create_future()
+                await archive_queue.put((profile, entry, error, logo_future))
+                if error is None:
+                    pending_logos[logo_url] = logo_future
+                    await download_queue.put((logo_url, logo_future))
+                else:
+                    logo_future.set_result(None)
+        await archive_queue.put(None)
+        for _ in range(max_workers):
+            await download_queue.put(None)
+
+    async def fetch_logos():
+        while True:
+            item = await download_queue.get()
+            if item is None:
+                return
+            logo_url, logo_future = item
+            logo_content = await loop.run_in_executor(io_executor, download, logo_url, timeout)
+            logo_future.set_result(logo_content)
+
+    async def assemble():
+        while True:
+            item = await archive_queue.get()
+            if item is None:
+                return
+            profile, entry, error, logo_future = item
+            logo_content = await logo_future
+            if error is None and pending_logos.get(entry['logo_url']) is logo_future:
+                del pending_logos[entry['logo_url']]
+            try:
+                if error is not None:
+                    raise error
+                await loop.run_in_executor(archive_executor, add_profile, entry, logo_content)
+            except Exception as e:
+                skipped_items.append({
+                    'id': profile.get('id', 'Unknown ID'),
+                    'name': profile.get('name', 'Unknown Name'),
+                    'reason': str(e)
+                })
+
+    tasks = [asyncio.create_task(produce()), asyncio.create_task(assemble())]
+    tasks += [asyncio.create_task(fetch_logos()) for _ in range(max_workers)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        io_executor.shutdown(wait=True)
+        archive_executor.shutdown(wait=True)
+
+    return skipped_items
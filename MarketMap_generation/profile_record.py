@@ -0,0 +1,61 @@
+class ProfileRecord:
+    """One processed profile, shared by the tree, the summary results and the CSV rows.
+
+    Slotted so each profile costs a single small object instead of two dicts
+    and a tuple. Item access keeps the old dict views working: tree keys
+    ('id', 'status', 'logo', ...) and CSV column names ('gridid',
+    'status_name', 'Twitter handle', ...) both resolve to the same fields.
+    """
+
+    __slots__ = (
+        'id', 'name', 'tagLine', 'descriptionShort', 'logo_url', 'status', 'sector',
+        'product_type', 'has_main_product', 'twitter_handle', 'twitter_url', 'logo'
+    )
+
+    # CSV column / legacy key -> attribute
+    ALIASES = {
+        'gridid': 'id',
+        'status_name': 'status',
+        'Twitter handle': 'twitter_handle',
+        'Twitter URL': 'twitter_url',
+    }
+
+    def __init__(self, id, name, tagLine, descriptionShort, logo_url, status, sector,
+                 product_type=None, has_main_product=False, twitter_handle='', twitter_url='', logo=None):
+        self.id = id
+        self.name = name
+        self.tagLine = tagLine
+        self.descriptionShort = descriptionShort
+        self.logo_url = logo_url
+        self.status = status
+        self.sector = sector
+        self.product_type = product_type
+        self.has_main_product = has_main_product
+        self.twitter_handle = twitter_handle
+        self.twitter_url = twitter_url
+        self.logo = logo  # archive filename, set once the logo is downloaded
+
+    @property
+    def logo_success(self):
+        return bool(self.logo)
+
+    def __getitem__(self, key):
+        if key == 'has_main_product':
+            return "Yes" if self.has_main_product else "No"
+        try:
+            return getattr(self, self.ALIASES.get(key, key))
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def row(self, columns):
+        """Values for `columns` (CSV column names), in order."""
+        return [self[column] for column in columns]
+
+    def __repr__(self):
+        return f"ProfileRecord(id={self.id!r}, name={self.name!r}, sector={self.sector!r}, product_type={self.product_type!r})"
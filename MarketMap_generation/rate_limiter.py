@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+# Per-host limits. MM_HOST_RATE is the starting request rate per second (0 = none until the
+# host first throttles us), MM_HOST_MAX_RATE the ceiling it may probe up to (0 = none) and
+# MM_HOST_BURST the token bucket size. Concurrency adapts between 1 and MM_HOST_MAX_CONCURRENCY.
+DEFAULT_RATE = float(os.getenv("MM_HOST_RATE", "0"))
+DEFAULT_MAX_RATE = float(os.getenv("MM_HOST_MAX_RATE", "0"))
+DEFAULT_BURST = float(os.getenv("MM_HOST_BURST", "0"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("MM_HOST_MAX_CONCURRENCY", "32"))
+DEFAULT_INITIAL_CONCURRENCY = 8
+RATE_STEP = 1.0    # per cent of the rate added per success
+RATE_WINDOW = 1.0  # seconds over which the sent rate is measured
+
+class HostLimiter:
+    """Token bucket plus AIMD concurrency limit for one host.
+
+    Every success raises the concurrency limit by 1/limit (about +1 per
+    round of requests) and the rate by RATE_STEP per cent; a throttling
+    answer (429 or Retry-After) halves both, the rate measured
+    against what was actually sent over the last RATE_WINDOW.
+    A Retry-After pauses the whole host, not just the request that got it.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 initial_concurrency=DEFAULT_INITIAL_CONCURRENCY, max_rate=DEFAULT_MAX_RATE):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.limit = float(min(initial_concurrency, max_concurrency))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._tokens = self._bucket_size()
+        self._refilled_at = time.monotonic()
+        self._recent_starts = deque()
+        self._decreased_at = float("-inf")
+        self._condition = threading.Condition()
+
+    def _bucket_size(self):
+        return self.burst or max(self.rate, 1.0)
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self._tokens = min(self._bucket_size(), self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _observed_rate(self, now):
+        while self._recent_starts and now - self._recent_starts[0] > RATE_WINDOW:
+            self._recent_starts.popleft()
+        return float(len(self._recent_starts))
+
+    def acquire(self):
+        """Block until a request to this host may start."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    self._condition.wait(self.paused_until - now)
+                    continue
+                if self.in_flight >= int(self.limit):
+                    self._condition.wait()
+                    continue
+                if self.rate > 0:
+                    self._refill(now)
+                    if self._tokens < 1:
+                        self._condition.wait((1 - self._tokens) / self.rate)
+                        continue
+                    self._tokens -= 1
+                self._recent_starts.append(now)
+                self._observed_rate(now)
+                self.in_flight += 1
+                return
+
+    def release(self, outcome="ok", retry_after=None):
+        """Finish a request and adapt to its `outcome`.
+
+        "ok" probes upwards, "throttled" (429 or Retry-After) backs off, and
+        "error" (transport errors, other 5xx, exceptions) only frees the slot:
+        a failing host is neither pushed harder nor mistaken for a throttling one.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == "throttled":
+                # Requests already in flight when we backed off report the same overload;
+                # only the first throttle per window lowers the limits
+                if now - self._decreased_at >= RATE_WINDOW:
+                    self._decreased_at = now
+                    self.limit = max(1.0, self.limit / 2)
+                    self._refill(now)
+                    observed = self._observed_rate(now)
+                    self.rate = max(1.0, (min(self.rate, observed) if self.rate else observed) / 2)
+                    self._tokens = min(self._tokens, self._bucket_size())
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            elif outcome == "ok":
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+                if self.rate > 0:
+                    self._refill(now)
+                    self.rate *= 1 + RATE_STEP / 100
+                    if self.max_rate:
+                        self.rate = min(self.max_rate, self.rate)
+            self._condition.notify_all()
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(url):
+    """Return the shared limiter for the host of `url`."""
+    host = urlsplit(url).netloc.lower()
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = HostLimiter()
+        return limiter
+
+def reset_limiters():
+    with _limiters_lock:
+        _limiters.clear()
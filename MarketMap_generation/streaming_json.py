@@ -0,0 +1,134 @@
+import codecs
+import json
+import time
+
+from MarketMap_generation.graphql_cache import CacheWriter, open_cached, DEFAULT_TTL, FORCE_REFRESH
+from MarketMap_generation.http_client import request
+from MarketMap_generation.instrumentation import record
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_BATCH_SIZE = 1  # profiles per yielded page; 1 keeps a single decoded profile in memory
+
+_WHITESPACE = " \t\n\r"
+
+def iter_array_items(chunks, key="profileInfos"):
+    """Yield the elements of the first JSON array stored under `key`, decoding incrementally.
+
+    `chunks` is an iterable of bytes (e.g. response.iter_content()). Only the
+    undecoded tail of the stream and the current element are held in memory.
+    If the array never appears, the (small) document is parsed and reported.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    marker = f'"{key}"'
+    buffer = ""
+    position = 0
+    in_array = False
+
+    for chunk in chunks:
+        buffer = buffer[position:] + text_decoder.decode(chunk)
+        position = 0
+
+        if not in_array:
+            marker_at = buffer.find(marker)
+            bracket_at = buffer.find("[", marker_at + len(marker)) if marker_at >= 0 else -1
+            if bracket_at < 0:
+                continue
+            position = bracket_at + 1
+            in_array = True
+
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE + ",":
+                position += 1
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break  # element continues in the next chunk
+            position = end
+            yield item
+
+    buffer = buffer[position:] + text_decoder.decode(b"", final=True)
+    if not in_array:
+        try:
+            document = json.loads(buffer)
+        except json.JSONDecodeError:
+            raise Exception(f"Response is not valid JSON: {buffer[:500]}")
+        print("Unexpected response structure:", document)
+        raise Exception(f"Missing '{key}' in response")
+    raise Exception(f"Response ended inside the '{key}' array")
+
+def _batched(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_streamed_pages(url, query, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE, ttl=DEFAULT_TTL, force_refresh=FORCE_REFRESH):
+    """Yield profileInfos in small batches while the response is still downloading.
+
+    Goes through the GraphQL cache: a fresh cached body is streamed from disk,
+    otherwise the live response is streamed and written to the cache as it is
+    read, committed only when the whole array decoded cleanly.
+    """
+    cached = None if force_refresh else open_cached(url, query, None, ttl)
+    if cached is not None:
+        cached_chunks = iter(lambda: cached.read(chunk_size), b"")
+        received = 0
+
+        def counted_chunks():
+            nonlocal received
+            for chunk in cached_chunks:
+                received += len(chunk)
+                yield chunk
+
+        with cached:
+            yield from _batched(iter_array_items(counted_chunks()), batch_size)
+        record("graphql_cache", nbytes=received)
+        return
+
+    started = time.perf_counter()
+    response = request('POST', url, json={'query': query}, stream=True)
+    print(f"HTTP Status Code: {response.status_code}")
+    if response.status_code != 200:
+        record("graphql", seconds=time.perf_counter() - started, nbytes=len(response.content), failed=True)
+        print(f"Query failed with status code {response.status_code}")
+        print(f"Response content: {response.text}")
+        raise Exception(f"Query failed with status code: {response.status_code}")
+
+    cache_writer = CacheWriter(url, query) if ttl > 0 else None
+
+    received = 0
+
+    def tee_chunks():
+        nonlocal received
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            received += len(chunk)
+            if cache_writer is not None:
+                cache_writer.write(chunk)
+            yield chunk
+
+    chunks = tee_chunks()
+    completed = False
+    try:
+        yield from _batched(iter_array_items(chunks), batch_size)
+        # Read the rest of the body (closing braces, extensions) so the cached copy is complete
+        for _ in chunks:
+            pass
+        completed = True
+    finally:
+        response.close()
+        # Covers the whole streamed body, including time spent processing between chunks
+        record("graphql", seconds=time.perf_counter() - started, nbytes=received, failed=not completed)
+        if cache_writer is not None:
+            if completed:
+                cache_writer.commit()
+            else:
+                cache_writer.abort()
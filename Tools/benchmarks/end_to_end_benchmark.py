@@ -0,0 +1,153 @@
+import argparse
+import builtins
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(REPO_ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_ROOT, 'Tools', 'synthetic_data'))
+
+from standin_server import StandinState, start_server, load_recorded_profiles
+from generate_synthetic_profiles import generate_profiles, write_embedded_wallets_csv
+
+FLOWS = ['tgs7', 'ai', 'mtndao', 'embedded_wallets']
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Each run starts cold: no GraphQL or logo cache, caches kept inside the run's scratch directory.
+COLD_ENV = {'MM_GRAPHQL_CACHE_TTL': '0', 'MM_LOGO_CACHE': '0'}
+
+def run_flow(flow, url):
+    """Run one generator's main() non-interactively against `url` (called in the child process)."""
+    answers = iter(['bench', 'general'])
+    builtins.input = lambda prompt='': next(answers)
+
+    if flow == 'tgs7':
+        from MarketMap_generation import MM_generation_TGS7 as module
+        module.url = url
+    elif flow == 'ai':
+        from MarketMap_generation import MM_generation_TGS7_AI as module
+        module.url = url
+    elif flow == 'mtndao':
+        from MarketMap_generation.mtndao import MM_generation_mtndao as module
+        module.url = url
+    elif flow == 'embedded_wallets':
+        from MarketMap_generation.embedded_wallets import embedded_wallets_marketmap as module
+        module.GRAPHQL_URL = url
+        module.JWT_TOKEN = 'benchmark'
+    else:
+        raise ValueError(f"Unknown flow: {flow}")
+    module.main()
+
+def child_main(flow, url, result_path):
+    from MarketMap_generation.instrumentation import get_report, peak_rss_mb
+
+    started = time.perf_counter()
+    run_flow(flow, url)
+    elapsed = time.perf_counter() - started
+
+    # Outputs land under the scratch directory (../Outputs, ../mtndao/Outputs, embedded_wallets/outputs)
+    archives = glob.glob(os.path.join(os.path.dirname(os.getcwd()), '**', '*.zip'), recursive=True)
+    report = get_report().to_dict()
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'seconds': elapsed,
+            'peak_rss_mb': peak_rss_mb(),
+            'archive_bytes': sum(os.path.getsize(path) for path in archives),
+            'stages': {name: stage['seconds'] for name, stage in report['stages'].items()},
+        }, f)
+
+def benchmark(flow, size, state, server, extra_env, verbose=False):
+    """Run `flow` in a fresh process at `size` profiles and return its measurements."""
+    with tempfile.TemporaryDirectory(prefix=f"mm_bench_{flow}_") as scratch:
+        # Generators write to ../Outputs relative to their working directory
+        workdir = os.path.join(scratch, 'run')
+        os.makedirs(workdir)
+        if flow == 'embedded_wallets':
+            write_embedded_wallets_csv(os.path.join(workdir, 'Files', 'embedded_wallets_marketmap.csv'), state.profiles[:size])
+
+        result_path = os.path.join(scratch, 'result.json')
+        env = dict(os.environ, MM_CACHE_DIR=os.path.join(scratch, 'cache'), **COLD_ENV)
+        env.update(extra_env)
+        before = dict(state.stats)
+        command = [sys.executable, os.path.abspath(__file__), '--child', flow, '--url', f"{server.url}/graphql", '--result', result_path]
+        output = None if verbose else subprocess.DEVNULL
+        completed = subprocess.run(command, cwd=workdir, env=env, stdout=output, stderr=output)
+        if completed.returncode != 0 or not os.path.exists(result_path):
+            return {'flow': flow, 'profiles': size, 'error': f"exit code {completed.returncode}"}
+        with open(result_path, encoding='utf-8') as f:
+            result = json.load(f)
+
+    result.update({
+        'flow': flow,
+        'profiles': size,
+        'profiles_per_second': size / result['seconds'] if result['seconds'] else None,
+        'logo_requests': state.stats['logos'] - before['logos'],
+        'graphql_requests': state.stats['graphql'] - before['graphql'],
+    })
+    return result
+
+def parse_env(pairs):
+    env = {}
+    for pair in pairs:
+        name, _, value = pair.partition('=')
+        env[name] = value
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the market map generators against a local stand-in server.")
+    parser.add_argument('--flows', nargs='+', default=FLOWS, choices=FLOWS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES, help="profile counts to run")
+    parser.add_argument('--payload', help="recorded profileInfos response (JSON) to tile instead of synthetic profiles")
+    parser.add_argument('--graphql-latency', type=float, default=0.05, help="seconds per GraphQL response")
+    parser.add_argument('--logo-latency', type=float, default=0.02, help="seconds per logo response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of logo requests answered with 503")
+    parser.add_argument('--graphql-error-rate', type=float, default=0.0, help="fraction of GraphQL requests answered with 503")
+    parser.add_argument('--logo-rate-limit', type=int, default=0, help="logo requests per second before the stand-in answers 429")
+    parser.add_argument('--logo-bytes', type=int, default=0, help="fixed-size filler logos instead of generated images")
+    parser.add_argument('--env', nargs='*', default=[], metavar='NAME=VALUE', help="extra settings for the generators, e.g. MM_PIPELINE=1")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--verbose', action='store_true', help="show the generators' own output")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args.child, args.url, args.result)
+        return
+
+    state = StandinState(args.graphql_latency, args.logo_latency, args.error_rate, args.graphql_error_rate, args.logo_bytes, logo_rate_limit=args.logo_rate_limit)
+    server = start_server(state)
+    extra_env = parse_env(args.env)
+
+    results = []
+    print(f"{'Flow':<18} {'Profiles':>9} {'Time (s)':>10} {'Profiles/s':>11} {'Peak RSS (MB)':>14} {'Archive (MB)':>13} {'Logo GETs':>10}")
+    print("-" * 91)
+    for size in args.sizes:
+        if args.payload:
+            state.set_profiles(load_recorded_profiles(args.payload, size, server.url))
+        else:
+            state.set_profiles(generate_profiles(size, server.url))
+        for flow in args.flows:
+            result = benchmark(flow, size, state, server, extra_env, args.verbose)
+            results.append(result)
+            if 'error' in result:
+                print(f"{flow:<18} {size:>9} failed ({result['error']})")
+                continue
+            print(f"{flow:<18} {size:>9} {result['seconds']:>10.2f} {result['profiles_per_second']:>11.0f} "
+                  f"{result['peak_rss_mb'] or 0:>14.1f} {result['archive_bytes'] / 1e6:>13.2f} {result['logo_requests']:>10}")
+
+    server.shutdown()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+if __name__ == "__main__":
+    main()
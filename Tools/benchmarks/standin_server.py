@@ -0,0 +1,210 @@
+import argparse
+import functools
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'synthetic_data')))
+
+from generate_synthetic_profiles import generate_profiles, logo_bytes
+
+def load_recorded_profiles(path, count, logo_base_url):
+    """Profiles from a recorded response, tiled to `count` and with logos served locally."""
+    with open(path, encoding='utf-8') as f:
+        recorded = json.load(f)['data']['profileInfos']
+    profiles = []
+    for index in range(count):
+        profile = dict(recorded[index % len(recorded)])
+        if index >= len(recorded):
+            profile['id'] = f"{profile['id']}-{index // len(recorded)}"
+        if profile.get('logo'):
+            extension = os.path.splitext(profile['logo'].split('?')[0])[1] or '.png'
+            profile['logo'] = f"{logo_base_url}/logos/{profile['id']}{extension}"
+        profiles.append(profile)
+    return profiles
+
+class StandinState:
+    """Profiles, payload cache, fault settings and request counters shared by the handler threads."""
+
+    def __init__(self, graphql_latency=0.0, logo_latency=0.0, error_rate=0.0, graphql_error_rate=0.0, logo_bytes=0, logo_dir=None, seed=0, logo_rate_limit=0):
+        self.graphql_latency = graphql_latency
+        self.logo_latency = logo_latency
+        self.error_rate = error_rate
+        self.graphql_error_rate = graphql_error_rate
+        self.logo_bytes = logo_bytes
+        self.logo_dir = logo_dir
+        self.logo_rate_limit = logo_rate_limit
+        self.profiles = []
+        self._by_id = {}
+        self.stats = {'graphql': 0, 'graphql_errors': 0, 'logos': 0, 'logo_errors': 0, 'not_modified': 0, 'throttled': 0, 'bytes_sent': 0}
+        self._full_body = None
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._window = (0, 0)  # (second, logo requests served in it)
+
+    def set_profiles(self, profiles):
+        with self._lock:
+            self.profiles = profiles
+            self._by_id = {str(profile['id']): profile for profile in profiles}
+            self._full_body = None
+
+    def fail(self, rate):
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def throttle(self):
+        """True when this logo request exceeds logo_rate_limit requests per second."""
+        if not self.logo_rate_limit:
+            return False
+        with self._lock:
+            second, served = self._window
+            now = int(time.monotonic())
+            if now != second:
+                second, served = now, 0
+            self._window = (second, served + 1)
+            return served >= self.logo_rate_limit
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def graphql_body(self, query, variables):
+        ids = (variables or {}).get('profileIds')
+        # Only a top-level id filter; nested ones (e.g. productType ids) are ignored like every other filter
+        id_filter = re.search(r'profileInfos\s*\(\s*where:\s*\{\s*id:\s*\{\s*_in:\s*\[([^\]]*)\]', query)
+        if ids is None and id_filter:
+            ids = json.loads(f"[{id_filter.group(1)}]")
+        if ids is not None:
+            profiles = [self._by_id[str(i)] for i in ids if str(i) in self._by_id]
+        else:
+            page = re.search(r'limit:\s*(\d+),\s*offset:\s*(\d+)', query)
+            if not page:
+                # Full listing: serialised once and reused for every run
+                if self._full_body is None:
+                    self._full_body = json.dumps({'data': {'profileInfos': self.profiles}}).encode('utf-8')
+                return self._full_body
+            limit, offset = int(page.group(1)), int(page.group(2))
+            profiles = self.profiles[offset:offset + limit]
+        return json.dumps({'data': {'profileInfos': profiles}}).encode('utf-8')
+
+    def logo_body(self, path):
+        """Bytes for /logos/<path>: a corpus file, fixed-size filler or a generated image; None if unknown."""
+        path = path.split('?', 1)[0][len('/logos/'):]
+        if self.logo_dir:
+            target = os.path.realpath(os.path.join(self.logo_dir, path))
+            if not target.startswith(os.path.realpath(self.logo_dir) + os.sep) or not os.path.isfile(target):
+                return None
+            with open(target, 'rb') as f:
+                return f.read()
+        if self.logo_bytes:
+            # Deterministic bytes per path, so ETags are stable between runs
+            seed = hashlib.sha256(path.encode('utf-8')).digest()
+            return (seed * (self.logo_bytes // len(seed) + 1))[:self.logo_bytes]
+        return _generated_logo(path)
+
+@functools.lru_cache(maxsize=4096)
+def _generated_logo(path):
+    return logo_bytes(path)
+
+def make_handler(state):
+    class StandinHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body=b'', headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+                state.count('bytes_sent', len(body))
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            state.count('graphql')
+            if state.graphql_latency:
+                time.sleep(state.graphql_latency)
+            if state.fail(state.graphql_error_rate):
+                state.count('graphql_errors')
+                self._send(503, b'{"errors": [{"message": "stand-in injected failure"}]}', {'Content-Type': 'application/json'})
+                return
+            body = state.graphql_body(payload.get('query', ''), payload.get('variables'))
+            self._send(200, body, {'Content-Type': 'application/json'})
+
+        def do_GET(self):
+            if not self.path.startswith('/logos/'):
+                self._send(404)
+                return
+            state.count('logos')
+            if state.throttle():
+                state.count('throttled')
+                self._send(429, headers={'Retry-After': '1'})
+                return
+            if state.logo_latency:
+                time.sleep(state.logo_latency)
+            if state.fail(state.error_rate):
+                state.count('logo_errors')
+                self._send(503)
+                return
+            body = state.logo_body(self.path)
+            if body is None:
+                self._send(404)
+                return
+            etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+            if self.headers.get('If-None-Match') == etag:
+                state.count('not_modified')
+                self._send(304, headers={'ETag': etag})
+                return
+            self._send(200, body, {'Content-Type': 'application/octet-stream', 'ETag': etag})
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandinHandler
+
+def start_server(state, host='127.0.0.1', port=0):
+    """Serve `state` on a background thread; returns the server (url at server.url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.url = f"http://{host}:{server.server_port}"
+    threading.Thread(target=server.serve_forever, name="standin-server", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the GraphQL endpoint and logo hosts.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--profiles', type=int, default=1000, help="number of profiles to serve")
+    parser.add_argument('--payload', help="recorded profileInfos response (JSON) to serve instead of synthetic profiles")
+    parser.add_argument('--graphql-latency', type=float, default=0.0, help="seconds added to every GraphQL response")
+    parser.add_argument('--logo-latency', type=float, default=0.0, help="seconds added to every logo response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of logo requests answered with 503")
+    parser.add_argument('--graphql-error-rate', type=float, default=0.0, help="fraction of GraphQL requests answered with 503")
+    parser.add_argument('--logo-bytes', type=int, default=0, help="serve fixed-size filler logos of this many bytes instead of generated images")
+    parser.add_argument('--logo-rate-limit', type=int, default=0, help="answer logo requests beyond this many per second with 429 and Retry-After")
+    parser.add_argument('--logo-dir', help="serve logos from a corpus written by generate_synthetic_profiles.py")
+    args = parser.parse_args()
+
+    state = StandinState(args.graphql_latency, args.logo_latency, args.error_rate, args.graphql_error_rate, args.logo_bytes, args.logo_dir, logo_rate_limit=args.logo_rate_limit)
+    server = start_server(state, port=args.port)
+    if args.payload:
+        state.set_profiles(load_recorded_profiles(args.payload, args.profiles, server.url))
+    else:
+        state.set_profiles(generate_profiles(args.profiles, server.url))
+    print(f"Serving {len(state.profiles)} profiles at {server.url}/graphql (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
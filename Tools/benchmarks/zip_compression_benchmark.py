@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from MarketMap_generation.archive_writer import open_archive
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Archives produced by earlier exports; their logos make a realistic corpus.
+DEFAULT_CORPORA = [
+    os.path.join(REPO_ROOT, 'Outputs/vmtndao/mm_mtndao_grid_data_vmtndao_20250219_223812.zip'),
+    os.path.join(REPO_ROOT, 'Tools/get_AssetManagement_ProductTypes/output/AssetManagement_V1.zip'),
+]
+
+def load_corpus(paths, copies):
+    entries = []
+    for path in paths:
+        with zipfile.ZipFile(path) as z:
+            for info in z.infolist():
+                if not info.is_dir():
+                    entries.append((info.filename, z.read(info)))
+    # Repeat the corpus under distinct names to reach export-sized archives.
+    return [(f"copy{i}/{name}", content) for i in range(copies) for name, content in entries]
+
+def build_baseline(zip_path, entries):
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for name, content in entries:
+            zip_file.writestr(name, content)
+
+def build_policy(zip_path, entries, compresslevel):
+    with open_archive(zip_path, compresslevel=compresslevel, report=False) as zip_file:
+        for name, content in entries:
+            zip_file.writestr(name, content)
+
+def measure(build, entries, repeats, *args):
+    best = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        zip_path = os.path.join(tmp_dir, 'bench.zip')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            build(zip_path, entries, *args)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        size = os.path.getsize(zip_path)
+    return best, size
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare archive build time and size with and without the per-entry compression policy.")
+    parser.add_argument('corpora', nargs='*', default=DEFAULT_CORPORA, help="ZIP files whose entries form the logo set")
+    parser.add_argument('--copies', type=int, default=20, help="times the corpus is repeated")
+    parser.add_argument('--repeats', type=int, default=3, help="runs per variant, the best is reported")
+    args = parser.parse_args()
+
+    entries = load_corpus(args.corpora, args.copies)
+    raw_size = sum(len(content) for _, content in entries)
+    print(f"Corpus: {len(entries)} entries, {raw_size / 1e6:.1f} MB uncompressed\n")
+
+    variants = [
+        ("before: ZIP_DEFLATED for every entry", build_baseline, ()),
+        ("after: store images, deflate level 6", build_policy, (6,)),
+        ("after: store images, deflate level 1", build_policy, (1,)),
+    ]
+    print(f"{'Variant':<40} {'Time (s)':>10} {'Size (MB)':>10}")
+    print("-" * 62)
+    for label, build, extra in variants:
+        elapsed, size = measure(build, entries, args.repeats, *extra)
+        print(f"{label:<40} {elapsed:>10.3f} {size / 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
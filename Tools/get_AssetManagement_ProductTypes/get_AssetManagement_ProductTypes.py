@@ -1,9 +1,14 @@
-import requests
 import csv
 import os
+import sys
 import zipfile
 from urllib.parse import urlparse
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from MarketMap_generation.graphql_cache import cached_post
+from MarketMap_generation.logo_cache import fetch_logo
+
 GRAPHQL_ENDPOINT = "https://beta.node.thegrid.id/graphql"
 HEADERS = {
     "Content-Type": "application/json",
@@ -97,7 +102,7 @@ query GetFilteredProfiles {
 """
 
 def fetch_graphql_data():
-    response = requests.post(GRAPHQL_ENDPOINT, json={"query": QUERY}, headers=HEADERS)
+    response = cached_post(GRAPHQL_ENDPOINT, QUERY, headers=HEADERS)
     if response.status_code == 200:
         return response.json()["data"]["profileInfos"]
     else:
@@ -108,9 +113,9 @@ def download_logo(logo_url):
     if not logo_url:
         return None
     try:
-        response = requests.get(logo_url)
-        if response.status_code == 200:
-            return response.content
+        content, status_code = fetch_logo(logo_url)
+        if content is not None:
+            return content
         else:
             print(f"Failed to download logo from {logo_url}")
             return None
@@ -1,4 +1,9 @@
-import requests
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from MarketMap_generation.graphql_cache import cached_post
 
 url = "https://beta.node.thegrid.id/graphql"
 
@@ -85,7 +90,7 @@ query GetSolana {
 
 def fetch_profile_infos(url, query, chosen_sector=None):
     try:
-        response = requests.post(url, json={'query': query})
+        response = cached_post(url, query)
         if response.status_code == 200:
             data = response.json()
             if "data" in data and "profileInfos" in data["data"]:
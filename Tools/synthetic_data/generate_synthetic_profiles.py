@@ -0,0 +1,215 @@
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import struct
+import zlib
+
+try:
+    from PIL import Image
+except ImportError:  # JPEG/WebP logos fall back to PNG bytes without Pillow
+    Image = None
+
+# Weights follow the sector and product-type mix of earlier exports (Outputs/, Tools/version_comparison/Files).
+SECTOR_WEIGHTS = {
+    'Finance': 20, 'Infrastructure': 15, 'Data & Analytics': 11, 'Payments': 11, 'Asset Management': 11,
+    'Social': 7, 'Developer Tooling': 5, 'Venture Capital': 5, 'Gaming': 5, 'Service Provider': 4,
+    'Security': 2, 'Auditing': 2, 'Supply chain': 2,
+}
+PRODUCT_TYPE_WEIGHTS = {
+    'OnChain Data API': 13, 'Data Terminal': 13, 'Block Explorer': 8, 'Trading Terminal': 5, 'Decentralised Exchange': 8,
+    'Lending': 6, 'Wallet': 8, 'Oracle': 3, 'Bridge': 4, 'Staking': 4, 'Payment Processor': 5, 'Launchpad': 2,
+    'Developer Tooling': 3, 'Trading Bot': 2, 'DePin': 1, 'Decentralised Identity': 1,
+}
+ASSET_TYPE_WEIGHTS = {'Fungible Token': 6, 'Stablecoin': 2, 'NFT Collection': 2, 'Governance Token': 1}
+LOGO_EXTENSION_WEIGHTS = {'.svg': 75, '.png': 20, '.jpg': 3, '.webp': 2}
+STATUS_WEIGHTS = {'Active': 90, 'Inactive': 6, 'Closed': 4}
+
+# Default rates of the irregularities seen in real payloads
+DEFAULT_MISSING_RATE = 0.03       # missing/null optional fields (logo, tagLine, socials, profileSector, ...)
+DEFAULT_SHARED_LOGO_RATE = 0.08   # profiles reusing another profile's logo URL (brands with several products)
+DEFAULT_LARGE_LOGO_RATE = 0.002   # multi-MB raster logos
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def _products(rng, profile_id):
+    products = []
+    for n in range(rng.choices([0, 1, 2, 3, 5], weights=[15, 50, 20, 10, 5])[0]):
+        products.append({
+            'id': f"{profile_id}-p{n}",
+            'name': f"Product {n + 1}",
+            'isMainProduct': 0,
+            'productType': {'name': _weighted(rng, PRODUCT_TYPE_WEIGHTS)},
+        })
+    if products and rng.random() < 0.85:
+        products[rng.randrange(len(products))]['isMainProduct'] = 1
+    return products
+
+def _socials(rng, handle):
+    socials = [{'name': handle, 'urls': [{'url': f"https://x.com/{handle}"}]}]
+    if rng.random() < 0.3:
+        socials.append({'name': f"{handle}_dev", 'urls': [{'url': f"https://x.com/{handle}_dev"}, {'url': f"https://twitter.com/{handle}_dev"}]})
+    return socials
+
+def generate_profiles(count, logo_base_url, seed=0, missing_rate=DEFAULT_MISSING_RATE, shared_logo_rate=DEFAULT_SHARED_LOGO_RATE):
+    """`count` deterministic profiles in the shape of a profileInfos response.
+
+    The mix covers what the processors have to handle: weighted sectors and
+    product types, profiles without products (assets only), several socials,
+    mixed logo extensions (some with query strings), shared logo URLs and
+    occasionally missing or null fields.
+    """
+    rng = random.Random(seed)
+    profiles = []
+    logo_urls = []
+    for index in range(count):
+        profile_id = str(100000 + index)
+        handle = f"project{index}"
+        if logo_urls and rng.random() < shared_logo_rate:
+            logo = rng.choice(logo_urls)
+        else:
+            logo = f"{logo_base_url}/logos/{profile_id}{_weighted(rng, LOGO_EXTENSION_WEIGHTS)}"
+            if rng.random() < 0.05:
+                logo += f"?v={rng.randrange(1, 9)}"
+            logo_urls.append(logo)
+
+        products = _products(rng, profile_id)
+        assets = []
+        if not products or rng.random() < 0.2:
+            assets = [{'id': f"{profile_id}-a0", 'name': f"Token {index}", 'assetType': {'name': _weighted(rng, ASSET_TYPE_WEIGHTS)}}]
+
+        profile = {
+            'id': profile_id,
+            'name': f"Project {index}" if rng.random() > 0.01 else f"Project/{index} (beta)",
+            'logo': logo,
+            'tagLine': f"Tag line for project {index}",
+            'descriptionShort': f"Project {index} builds {rng.choice(['tools', 'markets', 'rails', 'data feeds'])} for on-chain users.",
+            'profileStatus': {'name': _weighted(rng, STATUS_WEIGHTS)},
+            'profileSector': {'name': _weighted(rng, SECTOR_WEIGHTS)},
+            'root': {
+                'id': f"root-{profile_id}",
+                'products': products,
+                'assets': assets,
+                'socials': _socials(rng, handle),
+            },
+        }
+
+        # Irregularities: absent keys and explicit nulls both occur in responses
+        if rng.random() < missing_rate:
+            profile['logo'] = None
+        if rng.random() < missing_rate:
+            del profile['tagLine']
+        if rng.random() < missing_rate:
+            profile['descriptionShort'] = None
+        if rng.random() < missing_rate:
+            profile['root']['socials'] = []
+        if rng.random() < missing_rate / 3:
+            profile['profileSector'] = None
+        profiles.append(profile)
+    return profiles
+
+def generate_response(count, logo_base_url, **kwargs):
+    return {'data': {'profileInfos': generate_profiles(count, logo_base_url, **kwargs)}}
+
+def write_embedded_wallets_csv(path, profiles, seed=0, missing_rate=DEFAULT_MISSING_RATE):
+    """Write the input CSV of embedded_wallets.process_csv_data for `profiles`."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['Match V2', 'Company  Segment', 'RootID'])
+        writer.writeheader()
+        for profile in profiles:
+            sector = profile.get('profileSector')
+            writer.writerow({
+                'Match V2': '#N/A' if rng.random() < missing_rate else profile['name'],
+                'Company  Segment': '' if rng.random() < missing_rate else (sector['name'] if sector else ''),
+                'RootID': '' if rng.random() < missing_rate / 3 else profile['id'],
+            })
+
+def logo_path(logo_url):
+    """Path of a logo URL below the corpus directory (also the stand-in's /logos/ route)."""
+    return logo_url.split('/logos/', 1)[1].split('?', 1)[0]
+
+def _png(width, height, seed, noise=False):
+    rng = random.Random(seed)
+    color = bytes(rng.randrange(256) for _ in range(3))
+    if noise:
+        # Incompressible pixels, like photographic logos served at full resolution
+        rows = b''.join(b'\x00' + rng.randbytes(width * 3) for _ in range(height))
+    else:
+        rows = b''.join(b'\x00' + (color * width)[:width * 3 - 8] + rng.randbytes(8) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows, 6)) + chunk(b'IEND', b''))
+
+def _svg(seed):
+    rng = random.Random(seed)
+    shapes = ''.join(
+        f'<circle cx="{rng.randrange(256)}" cy="{rng.randrange(256)}" r="{rng.randrange(8, 64)}" fill="#{rng.randrange(1 << 24):06x}"/>'
+        for _ in range(rng.randrange(3, 40))
+    )
+    return f'<svg xmlns="http://www.w3.org/2000/svg" width="256" height="256" viewBox="0 0 256 256">{shapes}</svg>'.encode('utf-8')
+
+def logo_bytes(path, large=False):
+    """Deterministic image bytes for a corpus path, in the format its extension names."""
+    extension = os.path.splitext(path)[1].lower()
+    seed = zlib.crc32(path.encode('utf-8'))
+    if extension == '.svg' and not large:
+        return _svg(seed)
+    size = 1024 if large else random.Random(seed).choice([64, 128, 256, 512])
+    png = _png(size, size, seed, noise=large)
+    if extension in ('.jpg', '.jpeg', '.webp') and Image is not None:
+        output = io.BytesIO()
+        Image.open(io.BytesIO(png)).save(output, format='JPEG' if extension != '.webp' else 'WEBP')
+        return output.getvalue()
+    return png
+
+def write_logo_corpus(profiles, directory, seed=0, large_logo_rate=DEFAULT_LARGE_LOGO_RATE):
+    """Write one file per distinct logo URL of `profiles` below `directory`; returns the file count."""
+    rng = random.Random(seed)
+    written = set()
+    for profile in profiles:
+        if not profile.get('logo'):
+            continue
+        path = logo_path(profile['logo'])
+        if path in written:
+            continue
+        written.add(path)
+        target = os.path.join(directory, path)
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(logo_bytes(path, large=rng.random() < large_logo_rate))
+    return len(written)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic profileInfos payloads, embedded-wallets CSVs and logo corpora.")
+    parser.add_argument('--profiles', type=int, default=10000, help="number of profiles")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='synthetic_output', help="directory for profiles.json, the CSV and logos/")
+    parser.add_argument('--logo-base-url', default='http://127.0.0.1:8765', help="host the logos will be served from (e.g. the benchmark stand-in)")
+    parser.add_argument('--missing-rate', type=float, default=DEFAULT_MISSING_RATE)
+    parser.add_argument('--shared-logo-rate', type=float, default=DEFAULT_SHARED_LOGO_RATE)
+    parser.add_argument('--large-logo-rate', type=float, default=DEFAULT_LARGE_LOGO_RATE)
+    parser.add_argument('--no-logos', action='store_true', help="skip writing the logo corpus")
+    args = parser.parse_args()
+
+    profiles = generate_profiles(args.profiles, args.logo_base_url, seed=args.seed,
+                                 missing_rate=args.missing_rate, shared_logo_rate=args.shared_logo_rate)
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, 'profiles.json'), 'w', encoding='utf-8') as f:
+        json.dump({'data': {'profileInfos': profiles}}, f)
+    write_embedded_wallets_csv(os.path.join(args.output, 'embedded_wallets_marketmap.csv'), profiles, seed=args.seed, missing_rate=args.missing_rate)
+    print(f"Wrote {len(profiles)} profiles to {args.output}/profiles.json and embedded_wallets_marketmap.csv")
+
+    if not args.no_logos:
+        count = write_logo_corpus(profiles, os.path.join(args.output, 'logos'), seed=args.seed, large_logo_rate=args.large_logo_rate)
+        print(f"Wrote {count} logos to {args.output}/logos/")
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,84 @@
+import numpy as np
 import pandas as pd
 
-def compare_csvs(file1_path, file2_path, output_path):
-    df1 = pd.read_csv(file1_path)
-    df2 = pd.read_csv(file2_path)
+COMPARE_COLUMNS = ['name', 'sector', 'product_type']
 
-    compare_columns = ['name', 'sector', 'product_type']
+def read_generation(path, key):
+    columns = [key] + [c for c in COMPARE_COLUMNS if c != key]
+    df = pd.read_csv(path, usecols=lambda c: c in columns, dtype=str)
+    for column in columns:
+        if column not in df.columns:
+            df[column] = np.nan
+    # Empty cells stay NaN here: an empty key must not match other empty keys
+    return df[columns]
 
-    df1 = df1[compare_columns].fillna('missing')
-    df2 = df2[compare_columns].fillna('missing')
+def outer_join(df1, df2, on):
+    # Number repeated keys so duplicates pair up one-to-one instead of fanning out into a cross product.
+    left = df1.assign(_occurrence=df1.groupby(on).cumcount())
+    right = df2.assign(_occurrence=df2.groupby(on).cumcount())
+    merged = pd.merge(left, right, on=[on, '_occurrence'], how='outer', suffixes=('_old', '_new'), indicator=True)
+    if on in COMPARE_COLUMNS:
+        merged[f'{on}_old'] = merged[on]
+        merged[f'{on}_new'] = merged[on]
+    return merged.drop(columns=['_occurrence'])
 
-    df1['source'] = 'old'
-    df2['source'] = 'new'
+def join_on(df1, df2, on):
+    # outer_join on the rows that have `on`; rows without it cannot be paired and come back unmatched
+    old_missing = df1[on].isna()
+    new_missing = df2[on].isna()
+    merged = outer_join(df1[~old_missing], df2[~new_missing], on)
+    merged['_merge'] = merged['_merge'].astype(str)
+    unmatched_old = df1[old_missing].rename(columns=lambda c: f'{c}_old').assign(_merge='left_only')
+    unmatched_new = df2[new_missing].rename(columns=lambda c: f'{c}_new').assign(_merge='right_only')
+    return pd.concat([merged, unmatched_old, unmatched_new], ignore_index=True)
 
-    merged = pd.merge(
-        df1, df2,
-        on=['name'],
-        how='outer',
-        suffixes=('_old', '_new'),
-        indicator=True
+def compare_csvs(file1_path, file2_path, output_path, key='gridid', name_fallback=True):
+    df1 = read_generation(file1_path, key)
+    df2 = read_generation(file2_path, key)
+
+    merged = join_on(df1, df2, key)
+
+    if name_fallback and key != 'name':
+        # Rows whose key has no counterpart (e.g. ids reissued between generations, or no id at all) are retried on name.
+        matched = merged[merged['_merge'] == 'both']
+        unmatched_old = merged.loc[merged['_merge'] == 'left_only', [f'{c}_old' for c in COMPARE_COLUMNS]]
+        unmatched_new = merged.loc[merged['_merge'] == 'right_only', [f'{c}_new' for c in COMPARE_COLUMNS]]
+        unmatched_old.columns = COMPARE_COLUMNS
+        unmatched_new.columns = COMPARE_COLUMNS
+        by_name = join_on(unmatched_old, unmatched_new, 'name')
+        merged = pd.concat([matched, by_name], ignore_index=True)
+
+    value_columns = [f'{c}_{side}' for c in COMPARE_COLUMNS for side in ('old', 'new')]
+    merged[value_columns] = merged[value_columns].fillna('missing')
+
+    old_present = merged['_merge'] != 'right_only'
+    new_present = merged['_merge'] != 'left_only'
+
+    results_df = pd.DataFrame({
+        'Old Name': merged['name_old'].where(old_present, ''),
+        'New Name': merged['name_new'].where(new_present, ''),
+        'Old Sector': merged['sector_old'].where(old_present, ''),
+        'New Sector': merged['sector_new'].where(new_present, ''),
+        'Old Product Type': merged['product_type_old'].where(old_present, ''),
+        'New Product Type': merged['product_type_new'].where(new_present, ''),
+    })
+
+    same = (results_df['Old Sector'] == results_df['New Sector']) & (results_df['Old Product Type'] == results_df['New Product Type'])
+    results_df['Status'] = np.select(
+        [merged['_merge'] == 'left_only', merged['_merge'] == 'right_only', same],
+        ['Removed', 'Added', 'Same'],
+        default='Changed'
     )
 
-    results = []
-
-    for _, row in merged.iterrows():
-        old_name = row['name'] if row['_merge'] != 'right_only' else ''
-        new_name = row['name'] if row['_merge'] != 'left_only' else ''
-        old_sector = row.get('sector_old', '') if row['_merge'] != 'right_only' else ''
-        new_sector = row.get('sector_new', '') if row['_merge'] != 'left_only' else ''
-        old_product_type = row.get('product_type_old', '') if row['_merge'] != 'right_only' else ''
-        new_product_type = row.get('product_type_new', '') if row['_merge'] != 'left_only' else ''
-
-        if row['_merge'] == 'left_only':
-            status = 'Removed'
-        elif row['_merge'] == 'right_only':
-            status = 'Added'
-        else:
-            if old_sector == new_sector and old_product_type == new_product_type:
-                status = 'Same'
-            else:
-                status = 'Changed'
-
-        results.append({
-            'Old Name': old_name,
-            'New Name': new_name,
-            'Old Sector': old_sector,
-            'New Sector': new_sector,
-            'Old Product Type': old_product_type,
-            'New Product Type': new_product_type,
-            'Status': status
-        })
-
-    results_df = pd.DataFrame(results)
+    sort_name = results_df['Old Name'].where(old_present, results_df['New Name'])
+    results_df = results_df.iloc[np.argsort(sort_name.to_numpy(), kind='stable')]
     results_df.to_csv(output_path, index=False)
 
-file1_path = 'Files/mm_tgs5_DA.csv'
-file2_path = 'Files/mm_tgs7_DA.csv'
-output_path = 'Results/compared_tgs5_w_tgs7_DA.csv'
+if __name__ == "__main__":
+    file1_path = 'Files/mm_tgs5_DA.csv'
+    file2_path = 'Files/mm_tgs7_DA.csv'
+    output_path = 'Results/compared_tgs5_w_tgs7_DA.csv'
 
-compare_csvs(file1_path, file2_path, output_path)
-print(f"Comparison completed. Results saved to {output_path}")
+    # TGS5 and TGS7 use different gridid spaces, so this pair is matched on name.
+    compare_csvs(file1_path, file2_path, output_path, key='name')
+    print(f"Comparison completed. Results saved to {output_path}")